@@ -1,39 +1,54 @@
+import os
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from .config import database_config, apply_sqlite_pragmas
 
-# Create Flask app instance
-app = Flask(__name__)
+# Extensions, bound to an app by create_app
+db = SQLAlchemy()
+login_manager = LoginManager()
+login_manager.login_view = 'auth.login'  # Specify the login page
 
-# Configure the secret key for encrypting session data
-app.config['SECRET_KEY'] = 'your_secret_key_here'
+def create_app(config=None):
+    """
+    Creates and configures the Flask app.
 
-# Configure SQLite database
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///C:\\Users\\gabriel.githinji\\Desktop\\tests\\Clothes-Store-Inventory-with-Flask\\instance\\your_database.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    Views, commands and their dependencies are imported here rather than
+    when the package is imported; PDF, mail and NumPy backends are only
+    imported when first used.
 
-# Configure the static folder
-app.static_folder = 'static'
+    Args:
+        config (dict, optional): Config values that override the defaults
+            and the environment (e.g., {'TESTING': True}).
 
-# Initialize SQLAlchemy database
-db = SQLAlchemy(app)
+    Returns:
+        Flask: The app.
+    """
+    app = Flask(__name__)
 
-# Initialize Flask-Login
-login_manager = LoginManager()
-login_manager.login_view = 'login'  # Specify the login page
-login_manager.init_app(app)
+    # Configure the secret key for encrypting session data
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your_secret_key_here')
+
+    # Configure the database from the environment (see config.database_config)
+    app.config.update(database_config())
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.update(config or {})
+
+    # Configure the static folder
+    app.static_folder = 'static'
 
-# Import the User model for Flask-Login
-from .models import User
+    # Initialize SQLAlchemy database
+    db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(db.engine, app.config['SQLITE_PRAGMAS'])
 
-@login_manager.user_loader
-def load_user(user_id):
-    # Return the user object based on user_id
-    return User.query.get(int(user_id))
+    # Initialize Flask-Login
+    login_manager.init_app(app)
 
-# Import routes (views)
-from . import routes
+    from . import analytics, commands, jobs, mail, metrics, pdf, profiling
+    from .blueprints import register_blueprints
 
-# To ensure the script runs the Flask application
-if __name__ == '__main__':
-    app.run(debug=True)  # Set debug=False in a production environment
+    for module in (analytics, jobs, mail, metrics, pdf, profiling, commands):
+        module.init_app(app)
+    register_blueprints(app)
+    return app
@@ -0,0 +1,170 @@
+# analytics.py
+
+from datetime import timedelta
+from sqlalchemy import and_, func, select
+from . import db
+from .cache import TTLCache
+from .models import DailySales, Product
+
+# Reports by date range; ranges that include today pick up new sales when the entry expires
+analytics_cache = TTLCache()
+
+def init_app(app):
+    app.config.setdefault('ANALYTICS_CACHE_SIZE', 256)
+    app.config.setdefault('ANALYTICS_CACHE_TTL', 60)
+    analytics_cache.maxsize = app.config['ANALYTICS_CACHE_SIZE']
+    analytics_cache.ttl = app.config['ANALYTICS_CACHE_TTL']
+
+# Default and largest number of products in the ranked lists
+DEFAULT_TOP = 10
+MAX_TOP = 100
+
+def load_sales_columns(start_date, end_date, session=None):
+    """
+    Reads the sales of a date range per product as column arrays.
+
+    One query sums the daily sales rows of every product; products without
+    sales in the range get zeros.
+
+    Args:
+        start_date (date): First day of the range.
+        end_date (date): Last day of the range, included.
+        session (Session, optional): The session to query. Default is db.session.
+
+    Returns:
+        dict: NumPy arrays with one value per product by column name (code, item,
+        category, stock, units, revenue, cost).
+    """
+    # NumPy is only imported once analytics are requested
+    import numpy as np
+
+    session = session if session is not None else db.session
+    rows = session.execute(
+        select(
+            Product.code,
+            Product.item,
+            func.coalesce(Product.category, ''),
+            Product.quantity,
+            func.coalesce(func.sum(DailySales.units), 0),
+            func.coalesce(func.sum(DailySales.revenue), 0),
+            func.coalesce(func.sum(DailySales.cost), 0)
+        ).outerjoin(DailySales, and_(
+            DailySales.product_code == Product.code,
+            DailySales.day >= start_date,
+            DailySales.day < end_date + timedelta(days=1)
+        )).group_by(Product.code)
+    ).all()
+
+    names = ('code', 'item', 'category', 'stock', 'units', 'revenue', 'cost')
+    types = (str, str, str, np.int64, np.int64, np.float64, np.float64)
+    columns = list(zip(*rows)) or [()] * len(names)
+    return {name: np.array(column, dtype=kind) for name, kind, column in zip(names, types, columns)}
+
+def _ratio(numerator, denominator):
+    # Element-wise division that gives 0 where the denominator is 0
+    import numpy as np
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+def _rounded(value):
+    return round(float(value), 4)
+
+def compute_analytics(columns, days, top=DEFAULT_TOP):
+    """
+    Computes the sales metrics from the columns of load_sales_columns().
+
+    Args:
+        columns (dict): The column arrays.
+        days (int): The number of days in the range.
+        top (int, optional): How many products the ranked lists hold.
+
+    Returns:
+        dict: The totals, the top sellers, the margin and sell-through by
+        category, and the products that will run out first.
+    """
+    import numpy as np
+
+    codes, item, category, stock = columns['code'], columns['item'], columns['category'], columns['stock']
+    units, revenue, cost = columns['units'], columns['revenue'], columns['cost']
+    profit = revenue - cost
+
+    # Share of the available units that sold, and days until the stock runs out at the range's pace
+    sell_through = _ratio(units, units + stock)
+    daily_units = units / max(days, 1)
+    stock_days = _ratio(stock, daily_units)
+
+    def product(index):
+        return {
+            'code': str(codes[index]),
+            'item': str(item[index]),
+            'category': str(category[index]) or 'Others',
+            'units': int(units[index]),
+            'revenue': _rounded(revenue[index]),
+            'profit': _rounded(profit[index]),
+            'sell_through': _rounded(sell_through[index]),
+            'stock': int(stock[index]),
+            'stock_days_remaining': _rounded(stock_days[index]) if units[index] else None
+        }
+
+    sold = np.flatnonzero(units > 0)
+    top_sellers = sold[np.lexsort((codes[sold], -revenue[sold], -units[sold]))][:top]
+    running_out = sold[np.lexsort((codes[sold], stock_days[sold]))][:top]
+
+    # Per-category totals
+    categories, category_index = np.unique(category, return_inverse=True)
+    category_totals = {
+        name: np.bincount(category_index, weights=values, minlength=len(categories))
+        for name, values in (('units', units), ('revenue', revenue), ('cost', cost), ('stock', stock))
+    }
+    category_profit = category_totals['revenue'] - category_totals['cost']
+    category_margin = _ratio(category_profit, category_totals['revenue'])
+    category_sell_through = _ratio(category_totals['units'], category_totals['units'] + category_totals['stock'])
+
+    total_units, total_stock = units.sum(), stock.sum()
+    total_revenue, total_cost = revenue.sum(), cost.sum()
+    return {
+        'totals': {
+            'units': int(total_units),
+            'revenue': _rounded(total_revenue),
+            'cost': _rounded(total_cost),
+            'profit': _rounded(total_revenue - total_cost),
+            'margin': _rounded(_ratio(total_revenue - total_cost, total_revenue)),
+            'sell_through': _rounded(_ratio(total_units, total_units + total_stock))
+        },
+        'top_sellers': [product(index) for index in top_sellers],
+        'categories': [
+            {
+                'category': str(categories[index]) or 'Others',
+                'units': int(category_totals['units'][index]),
+                'revenue': _rounded(category_totals['revenue'][index]),
+                'cost': _rounded(category_totals['cost'][index]),
+                'profit': _rounded(category_profit[index]),
+                'margin': _rounded(category_margin[index]),
+                'sell_through': _rounded(category_sell_through[index]),
+                'stock': int(category_totals['stock'][index])
+            }
+            for index in np.argsort(-category_totals['revenue'], kind='stable')
+        ],
+        'running_out': [product(index) for index in running_out]
+    }
+
+def sales_analytics(start_date, end_date, top=DEFAULT_TOP):
+    """
+    Returns the sales metrics of a date range, from the cache when possible.
+
+    Args:
+        start_date (date): First day of the range.
+        end_date (date): Last day of the range, included.
+        top (int, optional): How many products the ranked lists hold.
+
+    Returns:
+        dict: The metrics of compute_analytics() with the date range.
+    """
+    key = (start_date, end_date, top)
+    report = analytics_cache.get(key)
+    if report is None:
+        days = (end_date - start_date).days + 1
+        report = compute_analytics(load_sales_columns(start_date, end_date), days, top)
+        report.update(start_date=start_date.isoformat(), end_date=end_date.isoformat(), days=days)
+        analytics_cache.set(key, report)
+    return report
@@ -0,0 +1,68 @@
+# barcodes.py
+
+import hashlib
+import json
+from flask import jsonify, request
+from . import db
+from .metrics import barcode_lookup_duration
+from .models import Product
+
+# Scans read the product from the database every time (a primary key lookup), so every worker
+# process answers with current stock; tills that scanned a product before revalidate with its ETag
+
+def _product_entry(product):
+    # Serialize a product and tag it with a hash of its values
+    payload = product.serialize()
+    etag = hashlib.md5(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+    return payload, etag
+
+def get_product_payload(code):
+    """
+    Returns the serialized product of a code.
+
+    Args:
+        code (str): The product code.
+
+    Returns:
+        tuple: The Product.serialize() dict and its ETag, or None if no
+        product has the code.
+    """
+    with barcode_lookup_duration.time():
+        product = db.session.get(Product, code)
+        return _product_entry(product) if product is not None else None
+
+def get_product_payloads(codes):
+    """
+    Loads the serialized products of many codes with one query.
+
+    The products are read fresh from the database, as a basket needs
+    current stock levels.
+
+    Args:
+        codes (iterable): The product codes.
+
+    Returns:
+        dict: The Product.serialize() dicts of the codes that exist, by code.
+    """
+    return {
+        product.code: _product_entry(product)[0]
+        for product in Product.query.filter(Product.code.in_(set(codes))).all()
+    }
+
+def conditional_json(data, etag):
+    """
+    Builds a JSON response that answers If-None-Match with 304 Not Modified.
+
+    Args:
+        data (dict): The response body.
+        etag (str): The ETag of the body.
+
+    Returns:
+        Response: The JSON response, or an empty 304 response on a GET
+        whose If-None-Match matches the ETag.
+    """
+    response = jsonify(data)
+    response.set_etag(etag)
+    # Clients may keep the response but must revalidate it before use
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
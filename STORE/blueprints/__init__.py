@@ -0,0 +1,17 @@
+# blueprints/__init__.py
+
+def register_blueprints(app):
+    """
+    Imports the views and registers them on the app.
+
+    The views are only imported here, so importing the STORE package stays
+    cheap until an app is created.
+
+    Args:
+        app (Flask): The app.
+    """
+    from . import auth, inventory, sales, invoices
+
+    auth.init_app(app)
+    for module in (auth, inventory, sales, invoices):
+        app.register_blueprint(module.bp)
@@ -0,0 +1,115 @@
+# auth.py
+
+from flask import Blueprint, render_template, redirect, url_for, flash
+from flask_login import login_user, logout_user, current_user, login_required, user_logged_out
+from .. import db, login_manager
+from ..cache import TTLCache
+from ..forms import LoginForm, RegistrationForm
+from ..models import User
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.exc import IntegrityError
+
+bp = Blueprint('auth', __name__)
+
+# Cache of logged-in users so load_user does not query the database on every request
+user_cache = TTLCache()
+user_cache_columns = ('id', 'username', 'email', 'password_hash')
+
+def init_app(app):
+    app.config.setdefault('USER_CACHE_SIZE', 1024)
+    app.config.setdefault('USER_CACHE_TTL', 300)  # Seconds before a cached user is reloaded
+    user_cache.maxsize = app.config['USER_CACHE_SIZE']
+    user_cache.ttl = app.config['USER_CACHE_TTL']
+
+@login_manager.user_loader
+def load_user(user_id):
+    # Return the user object based on user_id, from the cache when possible
+    data = user_cache.get(user_id)
+    if data is None:
+        user = db.session.get(User, int(user_id))
+        if user is None:
+            return None
+        data = {column: getattr(user, column) for column in user_cache_columns}
+        user_cache.set(user_id, data)
+    # A detached copy: it is only read, never written through the session
+    return User(**data)
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def user_changed(mapper, connection, user):
+    # Flushed changes can still roll back, so users are evicted once the transaction commits;
+    # evicting now would let another request cache the old row again before the commit
+    object_session(user).info.setdefault('changed_users', set()).add(str(user.id))
+
+@event.listens_for(Session, 'after_commit')
+def evict_changed_users(session):
+    # Changed or deleted users are reloaded on their next request
+    for user_id in session.info.pop('changed_users', ()):
+        user_cache.pop(user_id)
+
+@event.listens_for(Session, 'after_rollback')
+def forget_changed_users(session):
+    session.info.pop('changed_users', None)
+
+@user_logged_out.connect
+def evict_logged_out_user(sender, user):
+    user_cache.pop(str(user.id))
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if current_user.is_authenticated:
+        return redirect(url_for('inventory.index'))
+    form = LoginForm()
+    if form.validate_on_submit():
+        user = User.query.filter_by(username=form.username.data).first()
+        if user and user.check_password(form.password.data):
+            login_user(user)
+            flash('Login successful!', 'success')
+            return redirect(url_for('inventory.index'))
+        else:
+            flash('Invalid username or password', 'warning')
+    return render_template('login.html', form=form)
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if current_user.is_authenticated:
+        return redirect(url_for('inventory.index'))
+    
+    form = RegistrationForm()
+    if form.validate_on_submit():
+        username = form.username.data
+        email = form.email.data
+        password = form.password.data
+
+        user = User(username=username, email=email)
+        user.set_password(password)
+        
+        try:
+            db.session.add(user)
+            db.session.commit()
+            flash('Your account has been created! You can now log in.', 'success')
+            return redirect(url_for('auth.login'))
+        except IntegrityError:
+            db.session.rollback()
+            flash('Username or email already exists. Please choose a different one.', 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'An error occurred: {str(e)}', 'danger')
+    else:
+        print(form.errors)
+    
+    return render_template('register.html', form=form)
+
+@bp.route('/logout')
+@login_required
+def logout():
+    logout_user()
+    flash('You have been logged out.', 'info')
+    return redirect(url_for('auth.initial'))
+
+@bp.route('/')
+def initial():
+    if current_user.is_authenticated:
+        return redirect(url_for('inventory.index'))
+    return render_template('initial.html')
@@ -0,0 +1,290 @@
+# inventory.py
+
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, request, Response, stream_with_context
+from flask_login import login_required
+from .. import db
+from ..forms import ProductForm
+from ..models import Product, ImportJob
+from sqlalchemy.exc import IntegrityError
+from collections import Counter
+from ..utils import prefix_index
+from ..inventory import inventory_summary, group_products, add_to_summary, remove_from_summary
+from ..search import search_products
+from ..pagination import page_args, keyset_page, stream_ndjson
+from ..codes import next_product_code
+from ..barcodes import get_product_payload, get_product_payloads, conditional_json
+from ..jobs import fail_stale_job, submit_import
+
+bp = Blueprint('inventory', __name__)
+
+# Largest basket accepted by /lookup_products
+MAX_LOOKUP_CODES = 500
+
+@bp.route('/handle_barcode/<barcode>', methods=['GET'])
+@login_required
+def handle_barcode(barcode):
+    # Determine action based on some condition
+    action = request.args.get('action', 'filter')
+
+    if action == 'delete':
+        # Handle product deletion
+        product = Product.query.filter_by(code=barcode).first()
+        if not product:
+            return jsonify({'error': 'Product not found'}), 404
+        remove_from_summary(product)
+        db.session.delete(product)
+        db.session.commit()
+        return jsonify({'action': 'delete', 'product': product.serialize()})
+    elif action not in ('add', 'filter'):
+        return jsonify({'error': 'Invalid action'}), 400
+
+    entry = get_product_payload(barcode)
+    if not entry:
+        return jsonify({'error': 'Product not found'}), 404
+    payload, etag = entry
+
+    # Handle product addition or filtering
+    return conditional_json({'action': action, 'product': payload}, f'{etag}-{action}')
+@bp.route('/index')
+@login_required
+def index():
+    # Totals per (item, category) are read from the inventory summary table
+    grouped_products_display = {
+        f"{group.category} - {group.item}": group for group in inventory_summary()
+    }
+
+    return render_template('index.html', grouped_products=grouped_products_display)
+
+
+@bp.route('/expand_items', methods=['POST'])
+@login_required
+def expand_items():
+    try:
+        data = request.get_json()
+
+        if not data or 'item' not in data:
+            return jsonify({'error': 'Invalid request data'}), 400
+
+        category_item = data['item']
+        category, item = category_item.split('___')
+        cursor, limit = page_args(data)
+        products_data, next_cursor = group_products(item, category, cursor, limit)
+
+        if not products_data and not cursor:
+            return jsonify({'error': 'No products found'}), 404
+
+        return jsonify({'products': products_data, 'next_cursor': next_cursor})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@bp.route('/get_items_by_code', methods=['POST'])
+@login_required
+def get_items_by_code():
+    try:
+        data = request.get_json()
+        code = data.get('code')
+
+        if not code:
+            return jsonify({'error': 'No code provided'}), 400
+
+        entry = get_product_payload(code)
+
+        if not entry:
+            return jsonify({'error': 'Product not found'}), 404
+
+        product_data, etag = entry
+        return conditional_json(product_data, etag)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+
+@bp.route('/lookup_products', methods=['POST'])
+@login_required
+def lookup_products():
+    # Resolve a whole basket of scanned codes in one query
+    data = request.get_json(silent=True) or {}
+    codes = data.get('codes')
+
+    if not isinstance(codes, list) or not all(isinstance(code, str) for code in codes):
+        return jsonify({'error': 'codes must be a list of product codes'}), 400
+    if len(codes) > MAX_LOOKUP_CODES:
+        return jsonify({'error': f'At most {MAX_LOOKUP_CODES} codes can be looked up at once'}), 400
+
+    requested = Counter(code.strip() for code in codes if code.strip())
+    products = get_product_payloads(requested)
+
+    stock = {
+        code: {
+            'quantity': products[code]['quantity'],
+            'requested': count,
+            'available': products[code]['quantity'] >= count
+        }
+        for code, count in requested.items() if code in products
+    }
+    missing = [code for code in requested if code not in products]
+
+    return jsonify({'products': products, 'missing': missing, 'stock': stock})
+
+@bp.route('/grouped_products', methods=['GET'])
+@login_required
+def grouped_products():
+    try:
+        cursor, limit = page_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    # A category can continue on the next page
+    products, next_cursor = keyset_page(Product.query.filter(Product.quantity > 0), cursor, limit)
+    grouped_products = {}
+
+    for product in products:
+        category = product.category if product.category else 'Others'
+        if category not in grouped_products:
+            grouped_products[category] = []
+        grouped_products[category].append(product.serialize())
+
+    return jsonify({'products': grouped_products, 'next_cursor': next_cursor})
+
+@bp.route('/export_products', methods=['GET'])
+@login_required
+def export_products():
+    # Stream every product as newline-delimited JSON, one chunk of rows at a time
+    query = Product.query
+    if request.args.get('in_stock'):
+        query = query.filter(Product.quantity > 0)
+    return Response(
+        stream_with_context(stream_ndjson(query, Product.serialize)),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=products.ndjson'}
+    )
+
+@bp.route('/add_product', methods=['GET', 'POST'])
+@login_required
+def add_product():
+    form = ProductForm()
+    if form.validate_on_submit():
+        # Extract the code prefix
+        code_prefix = form.code.data.upper()
+
+        # Determine the item and category from the longest matching prefix
+        item, category = prefix_index.resolve(code_prefix) or (None, None)
+
+        if not item:
+            # Handle invalid code prefix
+            flash('Invalid code prefix!', 'danger')
+            return redirect(url_for('inventory.add_product'))
+
+        try:
+            # Generate the tag from the prefix's code sequence
+            subcategory = category  # For readability
+            product_code = next_product_code(item, subcategory)
+
+            product = Product(
+                code=product_code,
+                item=item,
+                category=subcategory,
+                type_material=form.type_material.data,
+                size=form.size.data,
+                color=form.color.data,
+                description=form.description.data,
+                buying_price=form.buying_price.data,
+                selling_price=form.selling_price.data
+            )
+
+            db.session.add(product)
+            db.session.flush()
+            add_to_summary(product)
+            db.session.commit()
+            flash('Product added successfully!', 'success')
+            return redirect(url_for('inventory.index'))
+        except IntegrityError:
+            flash('An error occurred while adding the product!', 'danger')
+            db.session.rollback()
+        except ValueError as e:
+            flash(f'Error: {str(e)}', 'danger')
+            db.session.rollback()
+    
+    return render_template('add_product.html', form=form)
+
+@bp.route('/update_product/<string:code>', methods=['GET', 'POST'])
+@login_required
+def update_product(code):
+    product = Product.query.filter_by(code=code).first_or_404()
+    form = ProductForm(obj=product)
+    if form.validate_on_submit():
+        remove_from_summary(product)
+        form.populate_obj(product)
+        product.profit = product.calculate_profit()
+        add_to_summary(product)
+        db.session.commit()
+        flash('Product updated successfully!', 'success')
+        return redirect(url_for('inventory.index'))
+    return render_template('update_product.html', form=form, product=product)
+
+@bp.route('/delete_product/<string:code>', methods=['POST'])
+@login_required
+def delete_product(code):
+    product = Product.query.filter_by(code=code).first_or_404()
+    remove_from_summary(product)
+    db.session.delete(product)
+    db.session.commit()
+    flash('Product deleted successfully!', 'success')
+    return redirect(url_for('inventory.index'))
+
+@bp.route('/filter_products', methods=['POST'])
+@login_required
+def filter_products():
+    data = request.get_json()
+    search_term = data.get('search_term', '').lower()
+
+    # Matching products come back best match first, one page at a time
+    try:
+        cursor, limit = page_args(data)
+        filtered_products, next_cursor = search_products(search_term, cursor, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    grouped_products = {}
+    for product in filtered_products:
+        key = (product.item, product.category)
+        if key not in grouped_products:
+            grouped_products[key] = []
+        grouped_products[key].append(product)
+    
+    filtered_products_data = [
+        {
+            'category': category,
+            'item': item,
+            'products': [product.serialize() for product in products]
+        }
+        for (item, category), products in grouped_products.items()
+    ]
+
+    return jsonify({'products': filtered_products_data, 'next_cursor': next_cursor})
+
+@bp.route('/add_data_to_db')
+@login_required
+def add_data_to_db():
+    try:
+        # The import runs in the background; poll the returned job for progress
+        job = submit_import('products.csv')  # Assuming your CSV file is named products.csv
+        return jsonify({
+            'message': 'Import started',
+            'job_id': job.id,
+            'status_url': url_for('inventory.import_job_status', job_id=job.id)
+        }), 202
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/import_jobs/<int:job_id>', methods=['GET'])
+@login_required
+def import_job_status(job_id):
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify({'error': 'Import job not found'}), 404
+    fail_stale_job(job)
+    return jsonify(job.serialize())
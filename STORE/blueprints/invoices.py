@@ -0,0 +1,98 @@
+# invoices.py
+
+from flask import Blueprint, render_template, flash, jsonify, request, Response, stream_with_context, send_file
+from flask_login import login_required
+from ..models import Invoice, InvoiceItem
+from sqlalchemy import or_
+from sqlalchemy.orm import selectinload
+from datetime import datetime, timedelta
+from concurrent.futures.process import BrokenProcessPool
+from ..pagination import invoices_page, page_args
+from ..pdf import get_invoice_pdf, stream_invoice_zip, pdf_backends
+
+bp = Blueprint('invoices', __name__)
+
+@bp.route('/print_invoice/<int:invoice_id>', methods=['GET'])
+@login_required
+def print_invoice(invoice_id):
+    invoice = Invoice.query.get_or_404(invoice_id)
+    return render_template('print_invoice.html', invoice=invoice)
+
+@bp.route('/print_invoice/<int:invoice_id>/pdf', methods=['GET'])
+@login_required
+def invoice_pdf(invoice_id):
+    invoice = Invoice.query.get_or_404(invoice_id)
+    try:
+        path = get_invoice_pdf(invoice, request.args.get('backend'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except TimeoutError:
+        # The render goes on in the pool; a retry picks up the cached file
+        return jsonify({'error': 'The PDF is taking too long to render, try again shortly'}), 504
+    except BrokenProcessPool:
+        return jsonify({'error': 'The PDF renderer stopped, try again'}), 503
+    # The file name includes the content hash, so the file never changes
+    return send_file(path, mimetype='application/pdf', download_name=f'invoice-{invoice.id}.pdf', max_age=86400)
+
+@bp.route('/invoices/export', methods=['GET'])
+@login_required
+def export_invoices():
+    # Stream the PDFs of a date range as one ZIP archive
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+
+    backend = request.args.get('backend')
+    if backend and backend not in pdf_backends:
+        return jsonify({'error': f'Unknown PDF backend: {backend}'}), 400
+
+    filename = f"invoices-{start_date or 'all'}-{end_date or 'all'}.zip"
+    return Response(
+        stream_with_context(stream_invoice_zip(start_date, end_date, backend)),
+        mimetype='application/zip',
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
+    )
+
+@bp.route('/invoices', methods=['GET'])
+@login_required
+def invoices():
+    # Load every invoice's items and their products in two extra queries, not one per row
+    invoices_query = Invoice.query.options(selectinload(Invoice.items).joinedload(InvoiceItem.product))
+    search_term = request.args.get('search_term')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    invoice_id = request.args.get('invoice_id')
+    entered_product_code = request.args.get('product_code')
+
+    # Check if any filtering criteria are present
+    filtering_criteria_present = search_term or start_date or end_date or invoice_id or entered_product_code
+
+    try:
+        if search_term:
+            invoices_query = invoices_query.filter(or_(
+                Invoice.customer_name.ilike(f'%{search_term}%'),
+                Invoice.customer_email.ilike(f'%{search_term}%')
+            ))
+        if start_date:
+            invoices_query = invoices_query.filter(Invoice.date_created >= datetime.strptime(start_date, '%Y-%m-%d'))
+        if end_date:
+            end_date = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+            invoices_query = invoices_query.filter(Invoice.date_created < end_date)
+        if invoice_id:
+            invoices_query = invoices_query.filter(Invoice.id == int(invoice_id))
+        if entered_product_code:
+            invoices_query = invoices_query.filter(Invoice.items.any(InvoiceItem.product_code == entered_product_code))
+
+        # Newest first, one page at a time
+        cursor, limit = page_args(request.args)
+        invoices, next_cursor = invoices_page(invoices_query, cursor, limit)
+    except ValueError:
+        flash('Invalid filter value.', 'danger')
+        return render_template('all_invoices.html', invoices=[], next_cursor=None, filtering_criteria_present=True)
+
+    return render_template('all_invoices.html', invoices=invoices, next_cursor=next_cursor,
+                           filtering_criteria_present=filtering_criteria_present)
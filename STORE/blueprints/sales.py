@@ -0,0 +1,169 @@
+# sales.py
+
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, jsonify, request
+from flask_login import login_required
+from .. import db
+from ..models import Sale
+from sqlalchemy.orm import contains_eager
+from datetime import datetime, timedelta
+from ..pagination import page_args, sales_page
+from ..checkout import checkout, CheckoutError
+from ..reports import sales_report, sales_total
+from ..analytics import sales_analytics, DEFAULT_TOP, MAX_TOP
+from ..pdf import schedule_invoice_pdf
+
+bp = Blueprint('sales', __name__)
+
+def sales_filter_values(args):
+    """
+    Reads the sales filters of a query string.
+
+    Args:
+        args (dict): The query string with start_date, end_date (included),
+            product (repeated) and product_code.
+
+    Returns:
+        tuple: The first and last day (dates, or None) and the product codes
+        to include (a list, possibly empty, or None for every product).
+
+    Raises:
+        ValueError: If a date is not in the YYYY-MM-DD format.
+    """
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+    start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+    end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+
+    product_codes = [code for code in args.getlist('product') if code] or None
+    entered_product_code = args.get('product_code')
+    if entered_product_code:
+        # Both filters apply: the entered code only counts if it is one of the selected products
+        product_codes = [code for code in product_codes or [entered_product_code] if code == entered_product_code]
+    return start_date, end_date, product_codes
+
+def filter_sales(args):
+    """
+    Builds the Sale query of the sales filters in a query string.
+
+    Args:
+        args (dict): The query string (see sales_filter_values).
+
+    Returns:
+        Query: The filtered sales, each joined with its product.
+
+    Raises:
+        ValueError: If a date is not in the YYYY-MM-DD format.
+    """
+    # The join already selects the product, so fill Sale.product from it instead of one query per row
+    sales_query = Sale.query.join(Sale.product).options(contains_eager(Sale.product))
+
+    # Filter on Sale columns so the (sale_date, product_code) indexes can be used
+    start_date, end_date, product_codes = sales_filter_values(args)
+    if start_date:
+        sales_query = sales_query.filter(Sale.sale_date >= start_date)
+    if end_date:
+        sales_query = sales_query.filter(Sale.sale_date < end_date + timedelta(days=1))
+    if product_codes is not None:
+        sales_query = sales_query.filter(Sale.product_code.in_(product_codes))
+    return sales_query
+
+@bp.route('/sales', methods=['GET', 'POST'])
+@login_required
+def sales():
+    # Check if any filtering criteria are present
+    filtering_criteria_present = any(
+        request.args.get(name) for name in ('start_date', 'end_date', 'product', 'product_code')
+    )
+
+    try:
+        cursor, limit = page_args(request.args)
+        sales, next_cursor = sales_page(filter_sales(request.args), cursor, limit)
+        # The total covers every matching sale, not just the page; the daily rollup holds one row
+        # per product per day, so this does not scan the sale table
+        total_sales_amount = sales_total(*sales_filter_values(request.args))
+    except ValueError as e:
+        flash(str(e), 'danger')
+        return render_template('sales.html', sales=[], total_sales_amount=0, next_cursor=None,
+                               filtering_criteria_present=True)
+
+    return render_template('sales.html', sales=sales, total_sales_amount=total_sales_amount,
+                           next_cursor=next_cursor, filtering_criteria_present=filtering_criteria_present)
+
+@bp.route('/sales/data', methods=['GET'])
+@login_required
+def sales_data():
+    # The sales listing as JSON, one page at a time
+    try:
+        cursor, limit = page_args(request.args)
+        sales, next_cursor = sales_page(filter_sales(request.args), cursor, limit)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'sales': [sale.serialize() for sale in sales], 'next_cursor': next_cursor})
+
+@bp.route('/sales/report', methods=['GET'])
+@login_required
+def sales_report_view():
+    # Sales per product over a date range, read from the daily rollup
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+
+    rows = sales_report(start_date, end_date, [code for code in request.args.getlist('product') if code])
+    products = [row._asdict() for row in rows]
+    totals = {name: sum(row[name] for row in products) for name in ('units', 'revenue', 'cost', 'profit')}
+    return jsonify({'products': products, 'totals': totals})
+
+@bp.route('/analytics', methods=['GET'])
+@login_required
+def analytics():
+    # Top sellers, margins, sell-through and stock days of a date range (default: the last 30 days)
+    try:
+        end_date = request.args.get('end_date')
+        end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else datetime.now().date()
+        start_date = request.args.get('start_date')
+        start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else end_date - timedelta(days=29)
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+    if start_date > end_date:
+        return jsonify({'error': 'The start date is after the end date'}), 400
+
+    top = request.args.get('top', DEFAULT_TOP)
+    try:
+        top = int(top)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid top'}), 400
+    if top < 1:
+        return jsonify({'error': 'Invalid top'}), 400
+
+    return jsonify(sales_analytics(start_date, end_date, min(top, MAX_TOP)))
+
+@bp.route('/make_sale', methods=['GET', 'POST'])
+@login_required
+def make_sale():
+    if request.method == 'POST':
+        customer_name = request.form.get('customer_name')
+        customer_email = request.form.get('customer_email')
+        product_codes = request.form.getlist('product_code[]')
+
+        try:
+            invoice, sold_out = checkout(customer_name, customer_email, product_codes)
+            flash('Sale and invoice recorded successfully!', 'success')
+            if sold_out:
+                flash(f"Now out of stock: {', '.join(sold_out)}", 'warning')
+            try:
+                # Render the PDF in the background so reprints are served from disk
+                schedule_invoice_pdf(invoice)
+            except Exception as e:
+                current_app.logger.warning('Could not schedule the PDF of invoice %s: %s', invoice.id, e)
+            return redirect(url_for('invoices.print_invoice', invoice_id=invoice.id))
+        except CheckoutError as e:
+            flash(str(e), 'danger')
+        except Exception as e:
+            db.session.rollback()
+            flash(f'An error occurred while processing the sale: {str(e)}', 'danger')
+
+    return render_template('make_sales.html')
@@ -0,0 +1,166 @@
+# checkout.py
+
+import random
+import time
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import case, insert, select, update
+from sqlalchemy.exc import OperationalError
+from . import db
+from .models import Product, Sale, Invoice, InvoiceItem
+from .inventory import remove_from_summary
+from .mail import queue_invoice_email, wake_email_sender
+from .reports import record_daily_sales
+from .metrics import checkout_duration, sale_items
+
+# Retry policy for checkouts that hit a locked database or a write conflict
+CHECKOUT_ATTEMPTS = 5
+CHECKOUT_BACKOFF = 0.05  # Seconds before the first retry, doubled after every attempt
+
+class CheckoutError(Exception):
+    """
+    Raised when a sale cannot be recorded. Nothing is written in that case.
+
+    Attributes:
+        missing (list): Codes that do not match any product.
+        out_of_stock (list): Codes without enough stock for the sale.
+    """
+
+    def __init__(self, message, missing=None, out_of_stock=None):
+        super().__init__(message)
+        self.missing = missing or []
+        self.out_of_stock = out_of_stock or []
+
+def _stock(quantities):
+    # Read the current stock of the basket's products
+    return dict(db.session.execute(
+        select(Product.code, Product.quantity).where(Product.code.in_(quantities))
+    ).all())
+
+def _out_of_stock(quantities):
+    stock = _stock(quantities)
+    return [code for code, quantity in quantities.items() if stock.get(code, 0) < quantity]
+
+def checkout(customer_name, customer_email, product_codes, attempts=CHECKOUT_ATTEMPTS):
+    """
+    Records the sale of a basket of products in a single transaction.
+
+    The products are loaded with one query and their stock is decremented
+    with one UPDATE that only touches rows that still have enough stock,
+    so concurrent tills can never oversell. The invoice email is queued in
+    the same transaction and sent in the background. A transaction that fails
+    because another till holds the database lock is retried with
+    exponential backoff.
+
+    Args:
+        customer_name (str): The name printed on the invoice.
+        customer_email (str): The email address of the customer.
+        product_codes (list): The scanned product codes; a code scanned
+            twice sells two units.
+        attempts (int, optional): How many times to try the transaction.
+
+    Returns:
+        tuple: The new Invoice and the codes of the products that sold out.
+
+    Raises:
+        CheckoutError: If a code is unknown or a product is out of stock.
+        OperationalError: If the database stays locked for every attempt.
+    """
+    quantities = Counter(code.strip() for code in product_codes if code and code.strip())
+    outcome = 'failed'
+    started = time.perf_counter()
+    try:
+        if not quantities:
+            raise CheckoutError('No products in the sale.')
+        for attempt in range(1, attempts + 1):
+            try:
+                invoice, sold_out = _checkout(customer_name, customer_email, quantities)
+                break
+            except OperationalError:
+                db.session.rollback()
+                if attempt == attempts:
+                    raise
+                # Jitter keeps tills that collided from retrying in lockstep
+                time.sleep(CHECKOUT_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+        outcome = 'ok'
+    except CheckoutError:
+        outcome = 'rejected'
+        raise
+    finally:
+        checkout_duration.labels(outcome).observe(time.perf_counter() - started)
+    sale_items.observe(sum(quantities.values()))
+
+    if invoice.customer_email:
+        wake_email_sender()
+    return invoice, sold_out
+
+def _checkout(customer_name, customer_email, quantities):
+    products = {
+        product.code: product
+        for product in Product.query.filter(Product.code.in_(quantities)).all()
+    }
+    missing = [code for code in quantities if code not in products]
+    if missing:
+        raise CheckoutError(f"Unknown product code(s): {', '.join(missing)}", missing=missing)
+
+    out_of_stock = [code for code, quantity in quantities.items() if products[code].quantity < quantity]
+    if out_of_stock:
+        raise CheckoutError(f"Out of stock: {', '.join(out_of_stock)}", out_of_stock=out_of_stock)
+
+    sold = case(quantities, value=Product.code)
+    decrement = (
+        update(Product)
+        .where(Product.code.in_(quantities), Product.quantity >= sold)
+        .values(quantity=Product.quantity - sold)
+        .execution_options(synchronize_session=False)
+    )
+    # The stock left after the sale comes from the UPDATE itself where the database can return it
+    returning = db.engine.dialect.update_returning
+    try:
+        if returning:
+            remaining = dict(db.session.execute(decrement.returning(Product.code, Product.quantity)).all())
+            updated = len(remaining)
+        else:
+            updated = db.session.execute(decrement).rowcount
+        if updated != len(quantities):
+            # Another sale took the stock after the products were loaded
+            db.session.rollback()
+            out_of_stock = _out_of_stock(quantities)
+            raise CheckoutError(f"Out of stock: {', '.join(out_of_stock)}", out_of_stock=out_of_stock)
+        if not returning:
+            # The rows stay locked by this transaction, so the stock read now is the stock it left
+            remaining = _stock(quantities)
+
+        now = datetime.now()
+        invoice = Invoice(
+            customer_name=customer_name,
+            customer_email=customer_email,
+            total_amount=sum(products[code].selling_price * quantity for code, quantity in quantities.items()),
+            date_created=now
+        )
+        db.session.add(invoice)
+        db.session.flush()
+
+        db.session.execute(insert(Sale), [
+            {'product_code': code, 'quantity_sold': quantity, 'sale_date': now}
+            for code, quantity in quantities.items()
+        ])
+        db.session.execute(insert(InvoiceItem), [
+            {'product_code': code, 'quantity': quantity, 'invoice_id': invoice.id}
+            for code, quantity in quantities.items()
+        ])
+        for code, quantity in quantities.items():
+            remove_from_summary(products[code], quantity)
+        record_daily_sales(now.date(), [(products[code], quantity) for code, quantity in quantities.items()])
+        queue_invoice_email(invoice)
+
+        # Not from the products loaded above: another sale may have changed their stock since
+        sold_out = [code for code in quantities if remaining[code] == 0]
+        db.session.commit()
+    except CheckoutError:
+        raise
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return invoice, sold_out
@@ -0,0 +1,128 @@
+# codes.py
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import CodeSequence, Product
+from .utils import generate_tag, get_prefix, prefix_index
+
+def split_code(code):
+    """
+    Splits a product code into its prefix and number.
+
+    Args:
+        code (str): The product code (e.g., 'TSC0012').
+
+    Returns:
+        tuple: The prefix and the number, or None if the code does not
+        follow the prefix-and-number format.
+    """
+    prefix = prefix_index.match(code)
+    if prefix is None or not code[len(prefix):].isdigit():
+        return None
+    return prefix, int(code[len(prefix):])
+
+def _last_used_number(prefix):
+    # Highest number already used with the prefix; read once when the sequence is created
+    codes = db.session.execute(
+        select(Product.code).where(Product.code.like(f'{prefix}%'))
+    ).scalars()
+    # Skip codes that belong to a longer prefix starting with this one
+    numbers = [parts[1] for parts in map(split_code, codes) if parts and parts[0] == prefix]
+    return max(numbers, default=0)
+
+def reserve_codes(prefix, count=1):
+    """
+    Reserves the next numbers of a prefix's code sequence.
+
+    The sequence row is incremented with a single UPDATE, which holds the
+    row (or, on SQLite, the database) lock until the caller commits, so
+    concurrent callers never get the same numbers. Numbers are never
+    handed out twice, even after products are deleted.
+
+    Args:
+        prefix (str): The code prefix (e.g., 'SC').
+        count (int, optional): How many numbers to reserve. Default is 1.
+
+    Returns:
+        range: The reserved numbers.
+    """
+    increment = (
+        update(CodeSequence)
+        .where(CodeSequence.prefix == prefix)
+        .values(last_value=CodeSequence.last_value + count)
+        .execution_options(synchronize_session=False)
+    )
+    if db.session.execute(increment).rowcount == 0:
+        # First code of the prefix: start after the codes already in use
+        try:
+            with db.session.begin_nested():
+                db.session.add(CodeSequence(prefix=prefix, last_value=_last_used_number(prefix) + count))
+        except IntegrityError:
+            # Another request created the sequence first
+            db.session.execute(increment)
+
+    last_value = db.session.execute(
+        select(CodeSequence.last_value).where(CodeSequence.prefix == prefix)
+    ).scalar_one()
+    return range(last_value - count + 1, last_value + 1)
+
+def next_product_code(item, category=None):
+    """
+    Allocates the next product code of an item and category.
+
+    Args:
+        item (str): The item of the product (e.g., 'shirt').
+        category (str, optional): The category of the product (e.g., 'casual').
+
+    Returns:
+        str: The new product code (e.g., 'SC0013').
+
+    Raises:
+        ValueError: If the item or category is invalid.
+    """
+    number = reserve_codes(get_prefix(item, category))[0]
+    return generate_tag(item, category, number)
+
+def advance_code_sequences(codes):
+    """
+    Moves code sequences past codes that were assigned elsewhere (e.g., imported).
+
+    Args:
+        codes (iterable): Product codes now in use.
+    """
+    highest = {}
+    for code in codes:
+        parts = split_code(code)
+        if parts:
+            prefix, number = parts
+            highest[prefix] = max(highest.get(prefix, 0), number)
+
+    # Sequences that do not exist yet start after the highest code when created
+    for prefix, number in highest.items():
+        db.session.execute(
+            update(CodeSequence)
+            .where(CodeSequence.prefix == prefix, CodeSequence.last_value < number)
+            .values(last_value=number)
+            .execution_options(synchronize_session=False)
+        )
+
+def rebuild_code_sequences():
+    """
+    Recreates every code sequence from the codes of the products.
+
+    Returns:
+        int: The number of sequences written.
+    """
+    highest = {}
+    for code in db.session.execute(select(Product.code)).scalars():
+        parts = split_code(code)
+        if parts:
+            prefix, number = parts
+            highest[prefix] = max(highest.get(prefix, 0), number)
+
+    db.session.execute(delete(CodeSequence))
+    for prefix, number in highest.items():
+        db.session.add(CodeSequence(prefix=prefix, last_value=number))
+    db.session.commit()
+    return len(highest)
@@ -0,0 +1,157 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import inspect
+from . import db
+from .inventory import rebuild_inventory_summary, verify_inventory_summary
+from .search import rebuild_search_index, search_index_available
+from .codes import rebuild_code_sequences
+from .pdf import stream_invoice_zip
+from .mail import send_pending_emails
+from .models import DailySales, InventorySummary, Product, Sale
+from .reports import rebuild_daily_sales, verify_daily_sales
+
+# Define command line commands (run with `flask --app STORE <command>`)
+@click.command('rebuild-summary')
+@with_appcontext
+@click.option('--verify', is_flag=True, help='Only report drifted groups, do not rebuild.')
+def rebuild_summary(verify):
+    """Rebuild the inventory summary table from the products."""
+    drifted = verify_inventory_summary()
+    for item, category in drifted:
+        click.echo(f'Drifted: {category} - {item}')
+
+    if verify:
+        click.echo(f'{len(drifted)} drifted group(s) found')
+        return
+
+    groups = rebuild_inventory_summary()
+    click.echo(f'Inventory summary rebuilt with {groups} group(s)')
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Create and refill the product full-text search index."""
+    products = rebuild_search_index()
+    click.echo(f'Search index rebuilt with {products} product(s)')
+
+@click.command('rebuild-code-sequences')
+@with_appcontext
+def rebuild_code_sequences_command():
+    """Reset the product code sequences from the codes in use."""
+    sequences = rebuild_code_sequences()
+    click.echo(f'{sequences} code sequence(s) rebuilt')
+
+@click.command('export-invoices')
+@with_appcontext
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='First day (YYYY-MM-DD).')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day, included (YYYY-MM-DD).')
+@click.option('--output', default='invoices.zip', show_default=True, help='Path of the ZIP archive.')
+@click.option('--backend', default=None, help='PDF backend (weasyprint, reportlab or fpdf).')
+def export_invoices_command(start, end, output, backend):
+    """Write the PDFs of every invoice in a date range to a ZIP archive."""
+    start = start.date() if start else None
+    end = end.date() if end else None
+    # The invoice template builds links, which needs a request context
+    with current_app.test_request_context(), open(output, 'wb') as file:
+        for part in stream_invoice_zip(start, end, backend, pool='export'):
+            file.write(part)
+    click.echo(f'Invoices written to {output}')
+
+@click.command('send-invoice-emails')
+@with_appcontext
+def send_invoice_emails():
+    """Send the invoice emails waiting in the outbox."""
+    with current_app.test_request_context():
+        counts = send_pending_emails()
+    click.echo(f"{counts['sent']} emails sent, {counts['failed']} failed.")
+
+def _create_missing_indexes():
+    # create_all() only adds indexes to new tables, so existing databases are migrated here
+    created = 0
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name not in {existing['name'] for existing in inspect(db.engine).get_indexes(table.name)}:
+                index.create(db.engine)
+                click.echo(f'Created {index.name} on {table.name}')
+                created += 1
+    return created
+
+def _add_missing_columns():
+    # create_all() only creates missing tables; nullable columns added to a model are added here
+    added = 0
+    for table in db.metadata.sorted_tables:
+        if not inspect(db.engine).has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspect(db.engine).get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing and column.nullable:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as connection:
+                    connection.exec_driver_sql(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}')
+                click.echo(f'Added {column.name} to {table.name}')
+                added += 1
+    return added
+
+def _fill_derived_tables():
+    # Tables the app keeps up to date as it writes start out empty on an existing database;
+    # they are filled from the rows they are derived from, or the pages reading them show nothing
+    if db.session.query(Product.code).first() and not db.session.query(InventorySummary.item).first():
+        click.echo(f'Inventory summary built with {rebuild_inventory_summary()} groups')
+    # The search index is created with the product table, so an existing product table lacks it
+    if db.engine.dialect.name == 'sqlite' and not search_index_available():
+        click.echo(f'Search index built with {rebuild_search_index()} products')
+    if db.session.query(Sale.id).first() and not db.session.query(DailySales.day).first():
+        click.echo(f'Daily sales rollup built with {rebuild_daily_sales()} rows')
+
+@click.command('create-indexes')
+@with_appcontext
+def create_indexes():
+    """Create the indexes declared on the models that an existing database lacks."""
+    click.echo(f'{_create_missing_indexes()} indexes created.')
+
+@click.command('init-db')
+@with_appcontext
+def init_db():
+    """Create missing tables, columns and indexes and fill new derived tables. Run once per deployment."""
+    db.create_all()
+    added = _add_missing_columns()
+    created = _create_missing_indexes()
+    _fill_derived_tables()
+    click.echo(f'Database ready ({added} columns and {created} indexes added to existing tables).')
+
+@click.command('rebuild-daily-sales')
+@with_appcontext
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), help='First day (YYYY-MM-DD).')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), help='Last day, included (YYYY-MM-DD).')
+@click.option('--verify', is_flag=True, help='Only report drifted days, do not rebuild.')
+def rebuild_daily_sales_command(start, end, verify):
+    """Backfill the daily sales rollup from the sales."""
+    start = start.date() if start else None
+    end = end.date() if end else None
+    drifted = verify_daily_sales(start, end)
+    for day, product_code in drifted:
+        click.echo(f'Drifted: {day} {product_code}')
+
+    if verify:
+        click.echo(f'{len(drifted)} drifted day(s) found')
+        return
+
+    rows = rebuild_daily_sales(start, end)
+    click.echo(f'Daily sales rebuilt with {rows} row(s)')
+
+# Registered on every app by create_app
+commands = (
+    rebuild_summary,
+    rebuild_search_index_command,
+    rebuild_code_sequences_command,
+    export_invoices_command,
+    send_invoice_emails,
+    create_indexes,
+    init_db,
+    rebuild_daily_sales_command
+)
+
+def init_app(app):
+    for command in commands:
+        app.cli.add_command(command)
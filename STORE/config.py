@@ -0,0 +1,77 @@
+# config.py
+
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Default database: instance/your_database.db (relative SQLite paths are resolved in the instance folder)
+DEFAULT_DATABASE_URL = 'sqlite:///your_database.db'
+
+def database_config(environ=None):
+    """
+    Reads the database settings from the environment.
+
+    Variables:
+        DATABASE_URL: The SQLAlchemy URL of the database.
+        DB_POOL_SIZE, DB_MAX_OVERFLOW: Connections kept open, and opened on top of them under load.
+        DB_POOL_TIMEOUT: Seconds to wait for a free connection.
+        DB_POOL_RECYCLE: Seconds after which a connection is replaced.
+        SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT (ms),
+        SQLITE_MMAP_SIZE (bytes): PRAGMAs set on every SQLite connection.
+
+    Args:
+        environ (dict, optional): The environment. Default is os.environ.
+
+    Returns:
+        dict: The Flask config values SQLALCHEMY_DATABASE_URI,
+        SQLALCHEMY_ENGINE_OPTIONS and SQLITE_PRAGMAS.
+    """
+    environ = os.environ if environ is None else environ
+    uri = environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    if uri.startswith('postgres://'):
+        # Hosting providers still hand out the scheme SQLAlchemy dropped
+        uri = 'postgresql://' + uri[len('postgres://'):]
+
+    # Check connections before use, so a restarted database server does not fail requests
+    options = {'pool_pre_ping': True}
+    url = make_url(uri)
+    if not (url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')):
+        # In-memory SQLite uses a single connection, which takes no pool sizes
+        options.update(
+            pool_size=int(environ.get('DB_POOL_SIZE', 5)),
+            max_overflow=int(environ.get('DB_MAX_OVERFLOW', 10)),
+            pool_timeout=int(environ.get('DB_POOL_TIMEOUT', 30)),
+            pool_recycle=int(environ.get('DB_POOL_RECYCLE', 1800))
+        )
+
+    # WAL lets readers run alongside a writer; NORMAL only syncs at checkpoints, which is safe in WAL mode
+    pragmas = {
+        'journal_mode': environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'mmap_size': int(environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    }
+
+    return {
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'SQLALCHEMY_ENGINE_OPTIONS': options,
+        'SQLITE_PRAGMAS': pragmas
+    }
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """
+    Sets PRAGMAs on every new connection of an engine, if it is SQLite.
+
+    Args:
+        engine (Engine): The engine, before it opens its first connection.
+        pragmas (dict): PRAGMA values by name (e.g., {'journal_mode': 'WAL'}).
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
@@ -0,0 +1,221 @@
+# inventory.py
+
+import math
+from sqlalchemy import delete, func, select
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import Product, InventorySummary
+from .pagination import DEFAULT_PAGE_SIZE, split_page
+
+# Columns returned for the rows of an expanded group
+group_product_columns = (
+    Product.code,
+    Product.size,
+    Product.type_material,
+    Product.color,
+    Product.description,
+    Product.buying_price,
+    Product.selling_price,
+    Product.profit,
+    Product.quantity
+)
+
+def grouped_inventory_summary():
+    """
+    Computes the stock totals of every (item, category) group in the database.
+
+    Only products that are still in stock are counted. The totals are
+    weighted by quantity, the same way the dashboard displays them.
+
+    Returns:
+        list: Rows with item, category, total_quantity, total_buying_price,
+        total_selling_price and total_profit attributes.
+    """
+    stmt = (
+        select(
+            Product.item,
+            Product.category,
+            func.sum(Product.quantity).label('total_quantity'),
+            func.sum(Product.buying_price * Product.quantity).label('total_buying_price'),
+            func.sum(Product.selling_price * Product.quantity).label('total_selling_price'),
+            func.sum(Product.profit * Product.quantity).label('total_profit')
+        )
+        .where(Product.quantity > 0)
+        .group_by(Product.item, Product.category)
+        .order_by(Product.category, Product.item)
+    )
+    return db.session.execute(stmt).all()
+
+def group_products(item, category, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Loads one page of the products of a single (item, category) group.
+
+    Called only when a group is expanded on the dashboard, so the summary
+    page never has to load individual products.
+
+    Args:
+        item (str): The item of the group (e.g., 'shirt').
+        category (str): The category of the group (e.g., 'casual').
+        cursor (str, optional): The last product code of the previous page.
+        limit (int, optional): The page size.
+
+    Returns:
+        tuple: Dicts holding the columns in group_product_columns and the
+        cursor of the next page.
+    """
+    stmt = (
+        select(*group_product_columns)
+        .where(Product.item == item, Product.category == category)
+        .order_by(Product.code)
+        .limit(limit + 1)
+    )
+    if cursor:
+        stmt = stmt.where(Product.code > cursor)
+    rows = [dict(row._mapping) for row in db.session.execute(stmt)]
+    return split_page(rows, limit, lambda row: row['code'])
+
+def _product_totals(product, quantity=None):
+    # A product only counts towards the summary while it is in stock
+    if quantity is None:
+        quantity = product.quantity or 0
+    quantity = max(quantity, 0)
+    return (
+        quantity,
+        product.buying_price * quantity,
+        product.selling_price * quantity,
+        product.profit * quantity
+    )
+
+def apply_summary_delta(item, category, quantity, buying_price, selling_price, profit):
+    """
+    Adds a delta to the summary row of an (item, category) group.
+
+    The row is created when the group does not exist yet, or incremented
+    if another transaction created it meanwhile. Nothing is committed; the
+    change is part of the caller's transaction.
+    """
+    category = category or ''
+    summary = db.session.get(InventorySummary, (item, category))
+    if summary is None:
+        try:
+            with db.session.begin_nested():
+                db.session.add(InventorySummary(
+                    item=item,
+                    category=category,
+                    total_quantity=quantity,
+                    total_buying_price=buying_price,
+                    total_selling_price=selling_price,
+                    total_profit=profit
+                ))
+            return
+        except IntegrityError:
+            # Another request created the group first; add the delta to its row
+            summary = db.session.get(InventorySummary, (item, category))
+    # Increment in SQL so concurrent deltas are not lost
+    summary.total_quantity = InventorySummary.total_quantity + quantity
+    summary.total_buying_price = InventorySummary.total_buying_price + buying_price
+    summary.total_selling_price = InventorySummary.total_selling_price + selling_price
+    summary.total_profit = InventorySummary.total_profit + profit
+    db.session.flush()
+
+def add_to_summary(product, quantity=None):
+    """
+    Adds a product's stock to the inventory summary.
+
+    Args:
+        product (Product): The product whose stock was added.
+        quantity (int, optional): Units to add instead of the product's quantity.
+    """
+    apply_summary_delta(product.item, product.category, *_product_totals(product, quantity))
+
+def remove_from_summary(product, quantity=None):
+    """
+    Removes a product's stock from the inventory summary.
+
+    Args:
+        product (Product): The product whose stock was removed.
+        quantity (int, optional): Units to remove instead of the product's quantity.
+    """
+    totals = _product_totals(product, quantity)
+    apply_summary_delta(product.item, product.category, *(-total for total in totals))
+
+def apply_summary_changes(changes):
+    """
+    Applies the stock changes of many products with one delta per group.
+
+    Args:
+        changes (iterable): (product, sign) pairs; sign is 1 for stock that
+            was added and -1 for stock that was removed. A product can be
+            any object with the Product columns as attributes.
+    """
+    totals = {}
+    for product, sign in changes:
+        group = totals.setdefault((product.item, product.category or ''), [0, 0, 0, 0])
+        for index, value in enumerate(_product_totals(product)):
+            group[index] += sign * value
+    for (item, category), delta in totals.items():
+        apply_summary_delta(item, category, *delta)
+
+def inventory_summary():
+    """
+    Reads the dashboard totals from the inventory summary table.
+
+    Returns:
+        list: InventorySummary rows of the groups that are in stock.
+    """
+    return (
+        InventorySummary.query
+        .filter(InventorySummary.total_quantity > 0)
+        .order_by(InventorySummary.category, InventorySummary.item)
+        .all()
+    )
+
+def verify_inventory_summary():
+    """
+    Compares the inventory summary table with the totals computed from products.
+
+    Returns:
+        list: (item, category) keys of the groups whose summary has drifted.
+    """
+    expected = {
+        (row.item, row.category or ''): row for row in grouped_inventory_summary()
+    }
+    stored = {
+        (row.item, row.category): row for row in InventorySummary.query.all()
+    }
+
+    drifted = []
+    for key in sorted(set(expected) | set(stored)):
+        actual = stored.get(key)
+        correct = expected.get(key)
+        if correct is None:
+            # Groups that sold out may keep an empty row
+            if actual.total_quantity != 0:
+                drifted.append(key)
+        elif actual is None or actual.total_quantity != correct.total_quantity or not all(
+            math.isclose(getattr(actual, name), getattr(correct, name), abs_tol=1e-6)
+            for name in ('total_buying_price', 'total_selling_price', 'total_profit')
+        ):
+            drifted.append(key)
+    return drifted
+
+def rebuild_inventory_summary():
+    """
+    Rebuilds the inventory summary table from the products.
+
+    Returns:
+        int: The number of groups written.
+    """
+    rows = grouped_inventory_summary()
+    db.session.execute(delete(InventorySummary))
+    for row in rows:
+        db.session.add(InventorySummary(
+            item=row.item,
+            category=row.category or '',
+            total_quantity=row.total_quantity,
+            total_buying_price=row.total_buying_price,
+            total_selling_price=row.total_selling_price,
+            total_profit=row.total_profit
+        ))
+    db.session.commit()
+    return len(rows)
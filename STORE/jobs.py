@@ -0,0 +1,122 @@
+# jobs.py
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, update
+from . import db
+from .models import ImportJob
+
+# Imports run in background threads so requests return immediately
+_executor = None
+
+def init_app(app):
+    app.config.setdefault('IMPORT_WORKERS', 1)
+    app.config.setdefault('IMPORT_JOB_TIMEOUT', 300)  # Seconds without progress before a running job counts as dead
+
+def _get_executor():
+    # Started on first use so creating an app does not start threads
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=current_app.config['IMPORT_WORKERS'], thread_name_prefix='import')
+    return _executor
+
+def count_rows(csv_file):
+    # Line count minus the header; only used to estimate progress
+    with open(csv_file, 'rb') as file:
+        return max(sum(1 for _ in file) - 1, 0)
+
+def _update_job(job_id, **values):
+    db.session.execute(update(ImportJob).where(ImportJob.id == job_id).values(**values))
+    db.session.commit()
+
+def run_import_job(app, job_id, csv_file):
+    """
+    Runs a CSV import job and records its progress and outcome.
+
+    Args:
+        app (Flask): The app whose database the products are imported into.
+        job_id (int): The id of the ImportJob row.
+        csv_file (str): Path of the CSV file to import.
+    """
+    from add_data import add_products_from_csv
+
+    with app.app_context():
+        try:
+            now = datetime.utcnow()
+            _update_job(job_id, status='running', started_at=now, heartbeat_at=now)
+
+            def progress(report):
+                _update_job(
+                    job_id, rows_processed=report['rows'], rows_failed=report['failed'], heartbeat_at=datetime.utcnow()
+                )
+
+            report = add_products_from_csv(csv_file, progress=progress)
+            _update_job(
+                job_id,
+                status='finished',
+                rows_processed=report['rows'],
+                rows_failed=report['failed'],
+                finished_at=datetime.utcnow(),
+                report=json.dumps(report)
+            )
+        except Exception as e:
+            db.session.rollback()
+            _update_job(job_id, status='failed', finished_at=datetime.utcnow(), error=str(e))
+
+def fail_stale_job(job):
+    """
+    Marks a running job as failed if its heartbeat stopped.
+
+    A job runs in a thread of the process that accepted it; if that process
+    dies (a crash, a deploy, gunicorn replacing the worker) the job would
+    otherwise stay running forever.
+
+    Args:
+        job (ImportJob): The job, refreshed if it is marked as failed.
+
+    Returns:
+        bool: Whether the job was marked as failed.
+    """
+    if job.status != 'running':
+        return False
+    timeout = current_app.config['IMPORT_JOB_TIMEOUT']
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    # Only if it is still stale, in case the job made progress since it was loaded
+    result = db.session.execute(
+        update(ImportJob)
+        .where(
+            ImportJob.id == job.id,
+            ImportJob.status == 'running',
+            func.coalesce(ImportJob.heartbeat_at, ImportJob.started_at) < cutoff
+        )
+        .values(
+            status='failed',
+            finished_at=datetime.utcnow(),
+            error=f'The import stopped: no progress for {timeout} seconds'
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    db.session.refresh(job)
+    return result.rowcount == 1
+
+def submit_import(csv_file):
+    """
+    Queues a CSV import to run in the background.
+
+    Args:
+        csv_file (str): Path of the CSV file to import.
+
+    Returns:
+        ImportJob: The job, already committed, whose id can be polled.
+
+    Raises:
+        OSError: If the file cannot be read.
+    """
+    job = ImportJob(filename=csv_file, status='queued', total_rows=count_rows(csv_file))
+    db.session.add(job)
+    db.session.commit()
+    _get_executor().submit(run_import_job, current_app._get_current_object(), job.id, csv_file)
+    return job
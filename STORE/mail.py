@@ -0,0 +1,229 @@
+# mail.py
+
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app, render_template
+from sqlalchemy import or_, select, update
+from . import db
+from .models import InvoiceEmail
+from .pdf import schedule_invoice_pdf
+
+# Invoice emails are queued in the outbox by checkout and sent in batches by a background thread
+def init_app(app):
+    app.config.setdefault('MAIL_SERVER', 'localhost')
+    app.config.setdefault('MAIL_PORT', 25)
+    app.config.setdefault('MAIL_DEFAULT_SENDER', 'store@localhost')
+    app.config.setdefault('INVOICE_EMAIL_BATCH_SIZE', 50)  # Emails sent per SMTP connection
+    app.config.setdefault('INVOICE_EMAIL_INTERVAL', 30)  # Seconds between outbox checks when idle
+    app.config.setdefault('INVOICE_EMAIL_ATTEMPTS', 5)
+    app.config.setdefault('INVOICE_EMAIL_BACKOFF', 60)  # Seconds before the first retry, doubled after every attempt
+    app.config.setdefault('INVOICE_EMAIL_LEASE', 300)  # Seconds a batch may spend sending before it can be claimed again
+    app.config.setdefault('INVOICE_EMAIL_SENDER', True)  # Run the sender thread in web processes
+    # Every web process sends the outbox, so retries left by a restarted worker still go out
+    app.before_request(_ensure_email_sender)
+
+def _get_mail():
+    # Flask-Mail is imported and set up when the first email is sent
+    if 'mail' not in current_app.extensions:
+        from flask_mail import Mail
+        Mail(current_app._get_current_object())
+    return current_app.extensions['mail']
+
+_wakeup = threading.Event()
+_sender = None
+_sender_lock = threading.Lock()
+
+def queue_invoice_email(invoice):
+    """
+    Adds an invoice email to the outbox in the current transaction.
+
+    The email is only sent once the transaction commits; call
+    wake_email_sender() afterwards to send it without waiting for the
+    next outbox check.
+
+    Args:
+        invoice (Invoice): The invoice, already flushed.
+
+    Returns:
+        InvoiceEmail: The outbox row, or None if the invoice has no email address.
+    """
+    if not invoice.customer_email:
+        return None
+    email = InvoiceEmail(invoice_id=invoice.id, recipient=invoice.customer_email)
+    db.session.add(email)
+    return email
+
+def _claim_batch(now):
+    # Mark a batch of due emails as ours, so other senders skip them until the lease ends
+    token = uuid.uuid4().hex
+    due = (
+        select(InvoiceEmail.id)
+        .where(
+            or_(InvoiceEmail.status == 'pending', InvoiceEmail.status == 'sending'),
+            InvoiceEmail.next_attempt_at <= now
+        )
+        .order_by(InvoiceEmail.id)
+        .limit(current_app.config['INVOICE_EMAIL_BATCH_SIZE'])
+    )
+    db.session.execute(
+        update(InvoiceEmail)
+        .where(InvoiceEmail.id.in_(due.scalar_subquery()))
+        .values(
+            status='sending',
+            claimed_by=token,
+            # The PDFs of the batch are rendered before sending, within INVOICE_PDF_TIMEOUT
+            next_attempt_at=now + timedelta(
+                seconds=current_app.config['INVOICE_EMAIL_LEASE'] + current_app.config['INVOICE_PDF_TIMEOUT']
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return InvoiceEmail.query.filter_by(claimed_by=token, status='sending').order_by(InvoiceEmail.id).all()
+
+def _schedule_pdf(email):
+    try:
+        return schedule_invoice_pdf(email.invoice)
+    except Exception as e:
+        return None, e
+
+def _build_message(email, pdf, deadline):
+    from flask_mail import Message
+
+    invoice = email.invoice
+    message = Message(
+        subject=f'Invoice #{invoice.id}',
+        recipients=[email.recipient],
+        body=render_template('emails/invoice_email_template.txt', invoice=invoice)
+    )
+    path, future = pdf
+    try:
+        if isinstance(future, Exception):
+            raise future
+        if future is not None:
+            future.result(timeout=max(deadline - time.monotonic(), 0))
+        with open(path, 'rb') as file:
+            message.attach(f'invoice-{invoice.id}.pdf', 'application/pdf', file.read())
+    except Exception as e:
+        # The invoice still reaches the customer, and can be printed from the app
+        current_app.logger.warning('Sending invoice %s without its PDF: %s', invoice.id, e)
+    return message
+
+def _build_messages(batch):
+    # The PDFs of a batch render in the pool together, and all before the SMTP connection is
+    # opened, so a slow PDF neither holds the connection nor outlives the lease
+    pdfs = [_schedule_pdf(email) for email in batch]
+    deadline = time.monotonic() + current_app.config['INVOICE_PDF_TIMEOUT']
+    messages = {}
+    for email, pdf in zip(batch, pdfs):
+        try:
+            messages[email.id] = _build_message(email, pdf, deadline)
+        except Exception as e:
+            _record_failure(email, e)
+    db.session.commit()
+    return messages
+
+def _record_failure(email, error):
+    email.attempts += 1
+    email.error = str(error)
+    email.claimed_by = None
+    if email.attempts >= current_app.config['INVOICE_EMAIL_ATTEMPTS']:
+        email.status = 'failed'
+    else:
+        email.status = 'pending'
+        # Jitter spreads out the retries of a batch that failed together
+        delay = current_app.config['INVOICE_EMAIL_BACKOFF'] * 2 ** (email.attempts - 1) * random.uniform(0.5, 1.5)
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+def send_pending_emails():
+    """
+    Sends the invoice emails that are due, one batch per SMTP connection.
+
+    The messages of a batch (with their PDFs) are built before connecting.
+    Every email is committed as sent or failed on its own, so a crash
+    never sends an email twice within its lease. Failed emails are retried
+    with exponential backoff until INVOICE_EMAIL_ATTEMPTS is reached.
+
+    Must be called inside a request (the templates link back to the app).
+
+    Returns:
+        dict: The number of emails sent and failed.
+    """
+    counts = {'sent': 0, 'failed': 0}
+    while True:
+        batch = _claim_batch(datetime.utcnow())
+        if not batch:
+            return counts
+        # Messages read their sender from the extension, so it is set up before building them
+        mail = _get_mail()
+        messages = _build_messages(batch)
+        counts['failed'] += len(batch) - len(messages)
+        try:
+            with mail.connect() as connection:
+                for email in batch:
+                    if email.id not in messages:
+                        continue
+                    try:
+                        connection.send(messages[email.id])
+                        email.status = 'sent'
+                        email.sent_at = datetime.utcnow()
+                        email.claimed_by = None
+                        email.error = None
+                        counts['sent'] += 1
+                    except Exception as e:
+                        _record_failure(email, e)
+                        counts['failed'] += 1
+                    db.session.commit()
+        except Exception as e:
+            # The connection failed: retry whatever the batch did not send
+            db.session.rollback()
+            current_app.logger.warning('Could not send invoice emails: %s', e)
+            for email in batch:
+                if email.status == 'sending':
+                    _record_failure(email, e)
+                    counts['failed'] += 1
+            db.session.commit()
+            return counts
+
+def _run_sender(app):
+    while True:
+        _wakeup.wait(app.config['INVOICE_EMAIL_INTERVAL'])
+        _wakeup.clear()
+        try:
+            with app.test_request_context():
+                send_pending_emails()
+        except Exception:
+            app.logger.exception('Invoice email sender failed')
+
+def start_email_sender(app):
+    """
+    Starts the background sender of this process unless it is running.
+
+    Does nothing when INVOICE_EMAIL_SENDER is off (send the outbox with
+    `flask send-invoice-emails` instead).
+
+    Args:
+        app (Flask): The app the sender works for.
+    """
+    global _sender
+    if not app.config['INVOICE_EMAIL_SENDER']:
+        return
+    with _sender_lock:
+        if _sender is None or not _sender.is_alive():
+            _sender = threading.Thread(target=_run_sender, args=(app,), name='invoice-email', daemon=True)
+            _sender.start()
+
+def _ensure_email_sender():
+    # A thread does not survive a fork, so the check runs again in every process
+    if _sender is None or not _sender.is_alive():
+        start_email_sender(current_app._get_current_object())
+
+def wake_email_sender():
+    """
+    Tells the background sender to check the outbox now, starting it if needed.
+    """
+    start_email_sender(current_app._get_current_object())
+    _wakeup.set()
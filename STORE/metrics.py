@@ -0,0 +1,472 @@
+# metrics.py
+
+import glob
+import hmac
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import Response, current_app, request
+from sqlalchemy import event
+from . import db
+
+# Prometheus metrics of the hot paths, served at /metrics. Under gunicorn every worker writes its
+# values to a file in METRICS_DIR and /metrics adds up the files of all workers.
+def init_app(app):
+    app.config.setdefault('METRICS_ENABLED', True)
+    app.config.setdefault('METRICS_DIR', os.environ.get('METRICS_DIR'))  # Unset for a single process
+    app.config.setdefault('METRICS_FLUSH_INTERVAL', 1)  # Seconds between writes of a worker's file
+    app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))  # Bearer token required by /metrics
+    # Without a token /metrics only answers requests from this machine, unless it is made public
+    app.config.setdefault('METRICS_PUBLIC', os.environ.get('METRICS_PUBLIC', '').lower() in ('1', 'true', 'yes'))
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    registry.configure(app.config['METRICS_DIR'], app.config['METRICS_FLUSH_INTERVAL'])
+    with app.app_context():
+        watch_pool(db.engine)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+
+class _Shards:
+    # One list of values per thread. A thread only ever writes its own list, so recording a value
+    # takes no lock; readers add the lists up. A new thread may inherit the list of a finished
+    # thread with the same ident, which keeps the number of lists bounded by the live threads.
+    def __init__(self, size):
+        self.size = size
+        self._by_thread = {}
+
+    def local(self):
+        ident = threading.get_ident()
+        values = self._by_thread.get(ident)
+        if values is None:
+            values = self._by_thread[ident] = [0] * self.size
+            registry.start()
+        return values
+
+    def total(self):
+        totals = [0] * self.size
+        for values in list(self._by_thread.values()):
+            for index, value in enumerate(values):
+                totals[index] += value
+        return totals
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        registry.register(self)
+
+    def labels(self, *values, **named_values):
+        """
+        Returns the time series of a combination of label values.
+
+        Args:
+            *values: The label values, in the order of labelnames.
+            **named_values: The label values by name.
+
+        Returns:
+            The series, which records values like an unlabeled metric.
+        """
+        key = tuple(str(named_values[name]) for name in self.labelnames) if named_values else tuple(map(str, values))
+        if len(key) != len(self.labelnames):
+            raise ValueError(f'{self.name} takes the labels {", ".join(self.labelnames)}')
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def collect(self):
+        # This process's values by label values
+        return {key: child.value() for key, child in list(self._children.items())}
+
+    def reset(self):
+        self._children = {}
+
+    @staticmethod
+    def merge(first, second):
+        return first + second
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.local()[0] += amount
+
+    def value(self):
+        return self._shards.total()[0]
+
+class Counter(_Metric):
+    """
+    A total that only goes up (e.g. rows imported).
+
+    Args:
+        name (str): The metric name, ending in _total.
+        documentation (str): The help text.
+        labelnames (tuple, optional): The label names.
+    """
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+class Gauge(_Metric):
+    """
+    A value read when the metrics are collected (e.g. connections in use).
+
+    The values of all processes are added up.
+
+    Args:
+        name (str): The metric name.
+        documentation (str): The help text.
+        labelnames (tuple, optional): The label names.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set_function(self, function):
+        """
+        Sets the function that reads the gauge.
+
+        Args:
+            function (callable): Returns the value, or a dict of values by
+                tuple of label values for a labeled gauge.
+        """
+        self._function = function
+
+    def collect(self):
+        if self._function is None:
+            return {}
+        values = self._function()
+        return values if isinstance(values, dict) else {(): values}
+
+class _HistogramChild:
+    def __init__(self, bounds):
+        self._bounds = bounds
+        # The count of every bucket (the last one is +Inf), then the sum of the values
+        self._shards = _Shards(len(bounds) + 2)
+
+    def observe(self, value):
+        values = self._shards.local()
+        values[bisect_left(self._bounds, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def value(self):
+        return self._shards.total()
+
+class Histogram(_Metric):
+    """
+    The distribution of observed values (e.g. durations) in fixed buckets.
+
+    Args:
+        name (str): The metric name.
+        documentation (str): The help text.
+        labelnames (tuple, optional): The label names.
+        buckets (tuple, optional): The upper bounds of the buckets, ascending.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        super().__init__(name, documentation, labelnames)
+        self.bounds = tuple(buckets or LATENCY_BUCKETS)
+
+    def _new_child(self):
+        return _HistogramChild(self.bounds)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    @staticmethod
+    def merge(first, second):
+        return [a + b for a, b in zip(first, second)]
+
+class Registry:
+    """
+    The metrics of the app and, under gunicorn, the files that share them
+    between worker processes.
+
+    Each process writes its values to its own file every few seconds (from
+    the first value it records); a process reads its own values directly.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.directory = None
+        self.interval = 1
+        self._path = None
+        self._flusher = None
+        self._start_lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def configure(self, directory, interval=1):
+        self.directory = directory
+        self.interval = interval
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        # Called once per thread and metric, never on the recording path itself
+        if self.directory is None or self._flusher is not None:
+            return
+        with self._start_lock:
+            if self._flusher is None:
+                self._path = os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+                self._flusher = threading.Thread(target=self._run_flusher, name='metrics', daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def reset(self):
+        # A forked process starts from zero instead of counting its parent's values again
+        for metric in self.metrics.values():
+            metric.reset()
+        self._path = None
+        self._flusher = None
+        self._start_lock = threading.Lock()
+
+    def collect(self):
+        """
+        Returns the values of this process.
+
+        Returns:
+            dict: The values of every metric by tuple of label values.
+        """
+        return {name: metric.collect() for name, metric in self.metrics.items()}
+
+    def flush(self):
+        """Writes the values of this process to its file, if it has one."""
+        if self._path is None:
+            return
+        values = {
+            name: {json.dumps(key): value for key, value in series.items()}
+            for name, series in self.collect().items()
+        }
+        temporary_path = f'{self._path}.tmp'
+        with open(temporary_path, 'w') as file:
+            json.dump({'pid': os.getpid(), 'metrics': values}, file)
+        os.replace(temporary_path, self._path)
+
+    def aggregate(self):
+        """
+        Adds up the values of this process and of the files of the others.
+
+        Returns:
+            dict: The values of every metric by tuple of label values.
+        """
+        totals = self.collect()
+        if not self.directory:
+            return totals
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            if path == self._path:
+                continue
+            values = _read_metrics(path)
+            if values is None:
+                # Gone with its process, or being replaced
+                continue
+            for name, series in values.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                for key, value in series.items():
+                    key = tuple(json.loads(key))
+                    current = totals[name].get(key)
+                    totals[name][key] = value if current is None else metric.merge(current, value)
+        return totals
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry.reset)
+
+# The counters and histograms of every worker that exited, added up
+DEAD_WORKERS_FILE = 'dead-workers.json'
+
+def _read_metrics(path):
+    try:
+        with open(path) as file:
+            return json.load(file)['metrics']
+    except (OSError, ValueError, KeyError):
+        return None
+
+def _write_metrics(path, values):
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'w') as file:
+        json.dump({'pid': None, 'metrics': values}, file)
+    os.replace(temporary_path, path)
+
+def mark_process_dead(directory, pid):
+    """
+    Folds the metrics file of a process that exited into the file of dead workers.
+
+    Its counters and histograms are added to that file, so totals do not go
+    down when gunicorn replaces a worker, and its gauges are dropped. The
+    directory keeps one file per live worker however often workers are
+    replaced. Call it from gunicorn's child_exit hook (in the master only,
+    as the file of dead workers has a single writer).
+
+    Args:
+        directory (str): The METRICS_DIR of the app.
+        pid (int): The id of the process.
+    """
+    paths = glob.glob(os.path.join(directory, f'{pid}-*.json'))
+    if not paths:
+        return
+    dead_path = os.path.join(directory, DEAD_WORKERS_FILE)
+    dead = _read_metrics(dead_path) or {}
+    for path in paths:
+        for name, series in (_read_metrics(path) or {}).items():
+            metric = registry.metrics.get(name)
+            if metric is None or metric.kind == 'gauge':
+                continue
+            totals = dead.setdefault(name, {})
+            for key, value in series.items():
+                totals[key] = value if key not in totals else metric.merge(totals[key], value)
+    _write_metrics(dead_path, dead)
+    # A scrape in between may count the process twice, never zero times
+    for path in paths:
+        os.remove(path)
+
+def clear_directory(directory):
+    """
+    Removes the metrics files of a previous run. Call it before the workers start.
+
+    Args:
+        directory (str): The METRICS_DIR of the app.
+    """
+    for path in glob.glob(os.path.join(directory, '*.json*')):
+        os.remove(path)
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _format_labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+def exposition(values):
+    """
+    Formats metric values in the Prometheus text format.
+
+    Args:
+        values (dict): The values of Registry.aggregate().
+
+    Returns:
+        str: The text served by /metrics.
+    """
+    lines = []
+    for name, metric in registry.metrics.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(values.get(name, {}).items()):
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.bounds + (math.inf,), value[:-1]):
+                cumulative += count
+                le = _format_value(bound) if bound == math.inf else repr(float(bound))
+                lines.append(f'{name}_bucket{_format_labels(metric.labelnames, key, le=le)} {_format_value(cumulative)}')
+            lines.append(f'{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(value[-1])}')
+            lines.append(f'{name}_count{_format_labels(metric.labelnames, key)} {_format_value(cumulative)}')
+    return '\n'.join(lines) + '\n'
+
+def metrics_view():
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+    elif not current_app.config['METRICS_PUBLIC'] and request.remote_addr not in LOCAL_ADDRESSES:
+        return Response('Forbidden: set METRICS_TOKEN to scrape from another host\n', status=403, mimetype='text/plain')
+    return Response(exposition(registry.aggregate()), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Addresses /metrics answers without a token
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+# Bucket bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+RENDER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+checkout_duration = Histogram(
+    'store_checkout_duration_seconds', 'Time to record a sale, retries included.', ('outcome',)
+)
+sale_items = Histogram(
+    'store_sale_items', 'Units sold per sale.', buckets=(1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+barcode_lookup_duration = Histogram(
+    'store_barcode_lookup_duration_seconds', 'Time to look up a scanned product code.'
+)
+search_duration = Histogram(
+    'store_search_duration_seconds', 'Time to find a page of products matching a search term.', ('method',)
+)
+pdf_render_duration = Histogram(
+    'store_invoice_pdf_render_duration_seconds', 'Time to render an invoice PDF in a worker process.',
+    ('backend',), buckets=RENDER_BUCKETS
+)
+import_rows = Counter('store_import_rows_total', 'CSV rows imported, by result.', ('result',))
+import_seconds = Counter(
+    'store_import_seconds_total', 'Time spent importing CSV rows; rows divided by time gives the throughput.'
+)
+pool_checkouts = Counter('store_db_pool_checkouts_total', 'Connections taken from the database pool.')
+pool_connections = Gauge('store_db_pool_connections', 'Connections of the database pool, by state.', ('state',))
+
+def watch_pool(engine):
+    """
+    Counts the checkouts of an engine's connection pool and reports its size.
+
+    Args:
+        engine (Engine): The engine.
+    """
+    @event.listens_for(engine, 'checkout')
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checkouts.inc()
+
+    def read_pool():
+        # Pools that keep a single connection (in-memory SQLite) do not count their connections
+        pool = engine.pool
+        if not hasattr(pool, 'checkedout'):
+            return {}
+        return {('checked_out',): pool.checkedout(), ('idle',): pool.checkedin()}
+
+    pool_connections.set_function(read_pool)
@@ -3,6 +3,7 @@ from sqlalchemy.orm import relationship
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import json
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -33,6 +34,9 @@ class Product(db.Model):
     quantity = db.Column(db.Integer, nullable=False, default=1)
     sales = relationship('Sale', backref='product', lazy=True)
 
+    # Stock can never go negative, even under concurrent sales
+    __table_args__ = (db.CheckConstraint('quantity >= 0', name='product_quantity_non_negative'),)
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.profit = self.calculate_profit()
@@ -51,7 +55,8 @@ class Product(db.Model):
             'description': self.description,
             'buying_price': self.buying_price,
             'selling_price': self.selling_price,
-            'profit': self.profit
+            'profit': self.profit,
+            'quantity': self.quantity
         }
 
     def __repr__(self):
@@ -68,6 +73,22 @@ class Sale(db.Model):
     quantity_sold = db.Column(db.Integer, nullable=False)
     sale_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    # Date ranges (optionally narrowed to products) and per-product history are read by index
+    __table_args__ = (
+        db.Index('ix_sale_date_product', 'sale_date', 'product_code'),
+        db.Index('ix_sale_product_date', 'product_code', 'sale_date'),
+    )
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'product_code': self.product_code,
+            'item': self.product.item if self.product else None,
+            'quantity_sold': self.quantity_sold,
+            'selling_price': self.product.selling_price if self.product else None,
+            'sale_date': self.sale_date.isoformat()
+        }
+
 class Invoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     customer_name = db.Column(db.String(128), nullable=False)
@@ -82,3 +103,81 @@ class InvoiceItem(db.Model):
     quantity = db.Column(db.Integer, nullable=False)
     invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False)
     product = db.relationship('Product')
+
+class InventorySummary(db.Model):
+    item = db.Column(db.String(100), primary_key=True)
+    category = db.Column(db.String(100), primary_key=True, default='')
+    total_quantity = db.Column(db.Integer, nullable=False, default=0)
+    total_buying_price = db.Column(db.Float, nullable=False, default=0)
+    total_selling_price = db.Column(db.Float, nullable=False, default=0)
+    total_profit = db.Column(db.Float, nullable=False, default=0)
+
+class ImportJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, finished or failed
+    total_rows = db.Column(db.Integer, nullable=True)  # Estimated from the line count of the file
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    rows_failed = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Last sign of life of a running job
+    report = db.Column(db.Text, nullable=True)  # JSON import report once finished
+    error = db.Column(db.Text, nullable=True)
+
+    def eta_seconds(self):
+        # Remaining time extrapolated from the rows processed so far
+        if self.status != 'running' or not self.started_at or not self.rows_processed or not self.total_rows:
+            return None
+        elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+        remaining = max(self.total_rows - self.rows_processed, 0)
+        return round(elapsed / self.rows_processed * remaining, 1)
+
+    def serialize(self):
+        return {
+            'id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'total_rows': self.total_rows,
+            'rows_processed': self.rows_processed,
+            'rows_failed': self.rows_failed,
+            'eta_seconds': self.eta_seconds(),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'report': json.loads(self.report) if self.report else None,
+            'error': self.error
+        }
+
+class CodeSequence(db.Model):
+    prefix = db.Column(db.String(10), primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)  # Last number handed out for the prefix
+
+class InvoiceEmail(db.Model):
+    # Outbox of invoice emails, written in the checkout transaction and sent in the background
+    id = db.Column(db.Integer, primary_key=True)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False)
+    recipient = db.Column(db.String(255), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)  # pending, sending, sent or failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(32), nullable=True)  # The sender batch that is sending the email
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    invoice = relationship('Invoice')
+
+class DailySales(db.Model):
+    # Sales rolled up per product per day, so reports do not re-aggregate every Sale row
+    day = db.Column(db.Date, primary_key=True)
+    product_code = db.Column(db.String(20), db.ForeignKey('product.code'), primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)  # At the selling price of the time of sale
+    cost = db.Column(db.Float, nullable=False, default=0)  # At the buying price of the time of sale
+    profit = db.Column(db.Float, nullable=False, default=0)
+
+    # Per-product ranges; the primary key already serves per-day ranges
+    __table_args__ = (db.Index('ix_daily_sales_product_day', 'product_code', 'day'),)
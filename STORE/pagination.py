@@ -0,0 +1,152 @@
+# pagination.py
+
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from .models import Invoice, Product, Sale
+
+# Page sizes for the product listing endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched per query when streaming an export
+EXPORT_CHUNK_SIZE = 500
+
+def page_args(args):
+    """
+    Reads the keyset pagination parameters of a request.
+
+    Args:
+        args (dict): The query string or JSON body of the request.
+
+    Returns:
+        tuple: The cursor (the last product code of the previous page, or None)
+        and the page size.
+
+    Raises:
+        ValueError: If the limit is not a positive integer.
+    """
+    cursor = args.get('cursor') or None
+    limit = args.get('limit', DEFAULT_PAGE_SIZE)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid limit')
+    if limit < 1:
+        raise ValueError('Invalid limit')
+    return cursor, min(limit, MAX_PAGE_SIZE)
+
+def split_page(rows, limit, code=lambda row: row.code):
+    """
+    Splits the rows fetched for a page into the page and its next cursor.
+
+    Pages are fetched with limit + 1 rows; the extra row only tells that
+    another page exists.
+
+    Args:
+        rows (list): Up to limit + 1 rows ordered by product code.
+        limit (int): The page size.
+        code (callable, optional): Returns the product code of a row.
+
+    Returns:
+        tuple: The rows of the page and the cursor of the next page (None on the last page).
+    """
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, code(rows[-1])
+    return rows, None
+
+def keyset_page(query, cursor, limit):
+    """
+    Fetches one page of a Product query ordered by code.
+
+    Args:
+        query (Query): The Product query to paginate.
+        cursor (str): The last product code of the previous page, or None.
+        limit (int): The page size.
+
+    Returns:
+        tuple: The products of the page and the cursor of the next page.
+    """
+    if cursor:
+        query = query.filter(Product.code > cursor)
+    rows = query.order_by(Product.code).limit(limit + 1).all()
+    return split_page(rows, limit)
+
+def sales_page(query, cursor, limit):
+    """
+    Fetches one page of a Sale query ordered by date.
+
+    Args:
+        query (Query): The Sale query to paginate.
+        cursor (str): The next_cursor returned with the previous page, or None.
+        limit (int): The page size.
+
+    Returns:
+        tuple: The sales of the page and the cursor of the next page.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    # Pages continue after the (sale_date, id) of the last sale
+    if cursor:
+        try:
+            last_date, last_id = cursor.split('|', 1)
+            last_date = datetime.fromisoformat(last_date)
+            last_id = int(last_id)
+        except ValueError:
+            raise ValueError('Invalid cursor')
+        query = query.filter(or_(
+            Sale.sale_date > last_date,
+            and_(Sale.sale_date == last_date, Sale.id > last_id)
+        ))
+    rows = query.order_by(Sale.sale_date, Sale.id).limit(limit + 1).all()
+    return split_page(rows, limit, lambda sale: f'{sale.sale_date.isoformat()}|{sale.id}')
+
+def invoices_page(query, cursor, limit):
+    """
+    Fetches one page of an Invoice query, newest first.
+
+    Args:
+        query (Query): The Invoice query to paginate.
+        cursor (str): The next_cursor returned with the previous page (the
+            id of its last invoice), or None.
+        limit (int): The page size.
+
+    Returns:
+        tuple: The invoices of the page and the cursor of the next page.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    if cursor:
+        try:
+            last_id = int(cursor)
+        except ValueError:
+            raise ValueError('Invalid cursor')
+        query = query.filter(Invoice.id < last_id)
+    rows = query.order_by(Invoice.id.desc()).limit(limit + 1).all()
+    return split_page(rows, limit, lambda invoice: str(invoice.id))
+
+def stream_ndjson(query, serialize, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Streams a Product query as newline-delimited JSON.
+
+    The query is read in keyset chunks, so memory use does not grow with
+    the number of products.
+
+    Args:
+        query (Query): The Product query to export.
+        serialize (callable): Turns a product into a JSON-serializable dict.
+        chunk_size (int, optional): Products fetched per query.
+
+    Yields:
+        str: One JSON document per product.
+    """
+    cursor = None
+    while True:
+        products, cursor = keyset_page(query, cursor, chunk_size)
+        for product in products:
+            yield json.dumps(serialize(product)) + '\n'
+        if cursor is None:
+            break
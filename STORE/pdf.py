@@ -0,0 +1,356 @@
+# pdf.py
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from functools import partial
+from flask import current_app, render_template, request
+from sqlalchemy.orm import selectinload
+from . import db
+from .metrics import pdf_render_duration
+from .models import Invoice, InvoiceItem
+
+# Invoice PDFs are rendered in worker processes and kept on disk by invoice id and content hash
+def init_app(app):
+    app.config.setdefault('INVOICE_PDF_BACKEND', 'weasyprint')  # weasyprint, reportlab or fpdf
+    # Per web process: under gunicorn the machine runs (web workers x INVOICE_PDF_WORKERS) renderers
+    app.config.setdefault('INVOICE_PDF_WORKERS', min(2, os.cpu_count() or 1))
+    # Batch exports from the command line run alone, so they render on every core
+    app.config.setdefault('INVOICE_EXPORT_WORKERS', os.cpu_count() or 1)
+    app.config.setdefault('INVOICE_PDF_DIR', os.path.join(app.instance_path, 'invoices'))
+    app.config.setdefault('INVOICE_PDF_TIMEOUT', 60)  # Seconds a request waits for a PDF
+
+# Invoices loaded, and PDFs rendered in parallel, per batch of an export
+EXPORT_CHUNK_SIZE = 50
+
+# Worker pools by name, with the config value that sizes them
+pool_sizes = {'requests': 'INVOICE_PDF_WORKERS', 'export': 'INVOICE_EXPORT_WORKERS'}
+_executors = {}
+_executors_lock = threading.Lock()
+
+def _get_executor(pool='requests'):
+    # Started on first use so importing the app does not start workers. Forking a process that
+    # runs threads (request threads, the mail sender) can copy a held lock into the child, so
+    # workers are started from a clean server process instead (a fresh interpreter on Windows).
+    with _executors_lock:
+        executor = _executors.get(pool)
+        if executor is None:
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            executor = _executors[pool] = ProcessPoolExecutor(
+                max_workers=current_app.config[pool_sizes[pool]],
+                mp_context=multiprocessing.get_context(method)
+            )
+        return executor
+
+def _forget_executor(pool, executor):
+    # A pool whose worker died (e.g. killed for memory) fails every later job, so the next job starts a new one
+    with _executors_lock:
+        if _executors.get(pool) is executor:
+            del _executors[pool]
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def _forget_broken_executor(pool, executor, future):
+    if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+        _forget_executor(pool, executor)
+
+def _submit(pool, function, *args):
+    # Submits a job, to a new pool if the current one turns out to be broken
+    for attempt in range(2):
+        executor = _get_executor(pool)
+        try:
+            future = executor.submit(function, *args)
+        except BrokenProcessPool:
+            _forget_executor(pool, executor)
+            if attempt:
+                raise
+            continue
+        future.add_done_callback(partial(_forget_broken_executor, pool, executor))
+        return future
+
+def invoice_data(invoice):
+    """
+    Collects the values printed on an invoice.
+
+    Args:
+        invoice (Invoice): The invoice.
+
+    Returns:
+        dict: Plain values that can be sent to a worker process.
+    """
+    return {
+        'id': invoice.id,
+        'date_created': invoice.date_created.strftime('%Y-%m-%d %H:%M') if invoice.date_created else '',
+        'customer_name': invoice.customer_name,
+        'customer_email': invoice.customer_email,
+        'total_amount': invoice.total_amount,
+        'items': [
+            {
+                'product_code': item.product_code,
+                'item': item.product.item if item.product else '',
+                'quantity': item.quantity,
+                'selling_price': item.product.selling_price if item.product else 0
+            }
+            for item in invoice.items
+        ]
+    }
+
+def invoice_resources():
+    """
+    Collects where the links and static files of the invoice template resolve.
+
+    Must be called inside a request.
+
+    Returns:
+        dict: The base URL of the app, the URL of its static files and the
+        folder they are read from.
+    """
+    return {
+        'base_url': request.url_root,
+        'static_url': request.url_root.rstrip('/') + current_app.static_url_path + '/',
+        'static_folder': current_app.static_folder
+    }
+
+def _render_weasyprint(html, data, path, resources):
+    from pathlib import Path
+    from urllib.parse import unquote, urlsplit
+    from weasyprint import HTML, default_url_fetcher
+    from werkzeug.security import safe_join
+
+    def fetch(url):
+        # Static files are read from disk instead of being requested from the app
+        if url.startswith(resources['static_url']):
+            filename = safe_join(resources['static_folder'], unquote(urlsplit(url[len(resources['static_url']):]).path))
+            if filename is None:
+                raise ValueError(f'Invalid static file: {url}')
+            url = Path(filename).as_uri()
+        return default_url_fetcher(url)
+
+    HTML(string=html, base_url=resources['base_url'], url_fetcher=fetch).write_pdf(path)
+
+def _render_reportlab(html, data, path, resources):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table
+
+    styles = getSampleStyleSheet()
+    rows = [['Product Code', 'Product', 'Quantity', 'Price']]
+    rows += [
+        [item['product_code'], item['item'], item['quantity'], f"KSh {item['selling_price']:.2f}"]
+        for item in data['items']
+    ]
+    rows.append(['', '', 'Total', f"KSh {data['total_amount']:.2f}"])
+    SimpleDocTemplate(path, pagesize=A4).build([
+        Paragraph(f"Invoice #{data['id']}", styles['Heading2']),
+        Paragraph(f"Date: {data['date_created']}", styles['Normal']),
+        Paragraph(f"Customer: {data['customer_name']}", styles['Normal']),
+        Paragraph(f"Email: {data['customer_email']}", styles['Normal']),
+        Spacer(1, 12),
+        Table(rows)
+    ])
+
+def _render_fpdf(html, data, path, resources):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, f"Invoice #{data['id']}", ln=1)
+    pdf.set_font('Arial', '', 11)
+    for line in (f"Date: {data['date_created']}", f"Customer: {data['customer_name']}",
+                 f"Email: {data['customer_email']}"):
+        pdf.cell(0, 7, line, ln=1)
+    pdf.ln(4)
+    for code, name, quantity, price in [('Product Code', 'Product', 'Quantity', 'Price')] + [
+        (item['product_code'], item['item'], str(item['quantity']), f"KSh {item['selling_price']:.2f}")
+        for item in data['items']
+    ]:
+        pdf.cell(45, 8, code, border=1)
+        pdf.cell(60, 8, name, border=1)
+        pdf.cell(30, 8, quantity, border=1)
+        pdf.cell(45, 8, price, border=1, ln=1)
+    pdf.cell(135, 8, 'Total', border=1)
+    pdf.cell(45, 8, f"KSh {data['total_amount']:.2f}", border=1, ln=1)
+    pdf.output(path)
+
+pdf_backends = {
+    'weasyprint': _render_weasyprint,
+    'reportlab': _render_reportlab,
+    'fpdf': _render_fpdf
+}
+
+def render_pdf_file(backend, html, data, path, resources):
+    """
+    Renders an invoice PDF to a file. Runs in a worker process.
+
+    The PDF is written to a temporary file first, so a half-written file is
+    never served.
+
+    Args:
+        backend (str): The name of the PDF backend in pdf_backends.
+        html (str): The rendered invoice_template.html (used by weasyprint).
+        data (dict): The invoice values (used by reportlab and fpdf).
+        path (str): Where to write the PDF.
+        resources (dict): Where links and static files resolve (see
+            invoice_resources(); used by weasyprint).
+
+    Returns:
+        str: The path of the PDF.
+    """
+    temporary_path = f'{path}.{os.getpid()}.tmp'
+    pdf_backends[backend](html, data, temporary_path, resources)
+    os.replace(temporary_path, path)
+    return path
+
+def _render_timed(backend, html, data, path, resources):
+    # Runs in a worker process, which does not share its metrics: the duration is sent back instead
+    started = time.perf_counter()
+    render_pdf_file(backend, html, data, path, resources)
+    return path, time.perf_counter() - started
+
+def _record_render(backend, future):
+    if not future.cancelled() and future.exception() is None:
+        pdf_render_duration.labels(backend).observe(future.result()[1])
+
+def _invoice_pdf_job(invoice, backend=None):
+    # The HTML, the values and the cache path of an invoice's PDF
+    backend = backend or current_app.config['INVOICE_PDF_BACKEND']
+    if backend not in pdf_backends:
+        raise ValueError(f'Unknown PDF backend: {backend}')
+    html = render_template('invoice_template.html', invoice=invoice)
+    data = invoice_data(invoice)
+    content_hash = hashlib.sha256(f'{backend}\n{html}'.encode()).hexdigest()[:16]
+    path = os.path.join(current_app.config['INVOICE_PDF_DIR'], f'invoice-{invoice.id}-{content_hash}.pdf')
+    return backend, html, data, path
+
+def schedule_invoice_pdf(invoice, backend=None, pool='requests'):
+    """
+    Starts rendering an invoice PDF in the worker pool unless it is cached.
+
+    Must be called inside a request (the template links back to the app).
+
+    Args:
+        invoice (Invoice): The invoice.
+        backend (str, optional): The PDF backend. Default is INVOICE_PDF_BACKEND.
+        pool (str, optional): The worker pool, 'requests' or 'export'.
+
+    Returns:
+        tuple: The path of the PDF and the Future rendering it, or None if
+        the PDF is already cached.
+    """
+    backend, html, data, path = _invoice_pdf_job(invoice, backend)
+    if os.path.exists(path):
+        return path, None
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    future = _submit(pool, _render_timed, backend, html, data, path, invoice_resources())
+    future.add_done_callback(partial(_record_render, backend))
+    return path, future
+
+def get_invoice_pdf(invoice, backend=None):
+    """
+    Returns the path of an invoice PDF, rendering it first if needed.
+
+    Args:
+        invoice (Invoice): The invoice.
+        backend (str, optional): The PDF backend. Default is INVOICE_PDF_BACKEND.
+
+    Returns:
+        str: The path of the cached PDF.
+
+    Raises:
+        TimeoutError: If the PDF takes longer than INVOICE_PDF_TIMEOUT.
+        BrokenProcessPool: If the worker rendering it died; the next
+            render starts a new pool.
+    """
+    path, future = schedule_invoice_pdf(invoice, backend)
+    if future is not None:
+        future.result(timeout=current_app.config['INVOICE_PDF_TIMEOUT'])
+    return path
+
+def iter_invoice_pdfs(start_date=None, end_date=None, backend=None, chunk_size=EXPORT_CHUNK_SIZE, pool='requests'):
+    """
+    Yields the PDFs of the invoices created in a date range, oldest first.
+
+    Invoices are loaded in chunks (with their items and products) and each
+    chunk is rendered in parallel in the worker pool. Cached PDFs are reused,
+    and only one chunk is held in memory at a time.
+
+    Must be called inside a request (the template links back to the app).
+
+    Args:
+        start_date (date, optional): First day of the range.
+        end_date (date, optional): Last day of the range, included.
+        backend (str, optional): The PDF backend. Default is INVOICE_PDF_BACKEND.
+        chunk_size (int, optional): Invoices per chunk.
+        pool (str, optional): The worker pool: 'requests' (INVOICE_PDF_WORKERS
+            processes, shared with the web requests of this process) or
+            'export' (INVOICE_EXPORT_WORKERS processes).
+
+    Yields:
+        tuple: The Invoice and the path of its PDF.
+    """
+    query = Invoice.query.options(selectinload(Invoice.items).joinedload(InvoiceItem.product))
+    if start_date:
+        query = query.filter(Invoice.date_created >= start_date)
+    if end_date:
+        query = query.filter(Invoice.date_created < end_date + timedelta(days=1))
+
+    last_id = 0
+    while True:
+        invoices = query.filter(Invoice.id > last_id).order_by(Invoice.id).limit(chunk_size).all()
+        if not invoices:
+            break
+        jobs = [schedule_invoice_pdf(invoice, backend, pool) for invoice in invoices]
+        for invoice, (path, future) in zip(invoices, jobs):
+            if future is not None:
+                future.result(timeout=current_app.config['INVOICE_PDF_TIMEOUT'])
+            yield invoice, path
+        last_id = invoices[-1].id
+        # Keep the session from accumulating every exported invoice
+        db.session.expunge_all()
+
+class _ZipStream:
+    # Write-only file object that hands the bytes written so far to the caller
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+def stream_invoice_zip(start_date=None, end_date=None, backend=None, pool='requests'):
+    """
+    Streams a ZIP archive with the PDFs of the invoices in a date range.
+
+    The archive is produced one invoice at a time, so memory use does not
+    depend on the number of invoices.
+
+    Args:
+        start_date (date, optional): First day of the range.
+        end_date (date, optional): Last day of the range, included.
+        backend (str, optional): The PDF backend. Default is INVOICE_PDF_BACKEND.
+        pool (str, optional): The worker pool (see iter_invoice_pdfs).
+
+    Yields:
+        bytes: The next part of the archive.
+    """
+    stream = _ZipStream()
+    # PDFs are already compressed, so they are stored as they are
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_STORED) as archive:
+        for invoice, path in iter_invoice_pdfs(start_date, end_date, backend, pool=pool):
+            archive.write(path, f'invoice-{invoice.id}.pdf')
+            yield stream.take()
+    yield stream.take()
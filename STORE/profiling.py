@@ -0,0 +1,207 @@
+# profiling.py
+
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import deque
+from flask import before_render_template, g, has_request_context, jsonify, request, template_rendered
+from flask_login import login_required
+from sqlalchemy import event
+from . import db
+
+# Opt-in request profiling: wall, SQL and template time per request, sent as a Server-Timing header,
+# kept per endpoint for /_profiling, and a log of slow statements by fingerprint
+def init_app(app):
+    app.config.setdefault('PROFILING', os.environ.get('PROFILING', '').lower() in ('1', 'true', 'yes'))
+    app.config.setdefault('PROFILING_WINDOW', 1000)  # Requests kept per endpoint
+    app.config.setdefault('PROFILING_SLOW_QUERY_MS', 100)
+    app.config.setdefault('PROFILING_MAX_FINGERPRINTS', 500)  # Distinct slow statements kept
+    if not app.config['PROFILING']:
+        return
+
+    profiler = RequestProfiler(
+        app.config['PROFILING_WINDOW'],
+        app.config['PROFILING_SLOW_QUERY_MS'],
+        app.config['PROFILING_MAX_FINGERPRINTS']
+    )
+    app.extensions['profiler'] = profiler
+    with app.app_context():
+        profiler.watch_engine(db.engine, app.logger)
+    before_render_template.connect(profiler.template_started, app)
+    template_rendered.connect(profiler.template_finished, app)
+    app.before_request(profiler.request_started)
+    app.after_request(profiler.request_finished)
+    app.add_url_rule('/_profiling', 'profiling', login_required(profiler.report))
+
+# Upper bounds (ms) of the histogram buckets of /_profiling
+HISTOGRAM_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+
+_string_literal = re.compile(r"'(?:[^']|'')*'")
+_number_literal = re.compile(r'\b\d+(?:\.\d+)?\b')
+_placeholder_list = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_whitespace = re.compile(r'\s+')
+
+def fingerprint(statement):
+    """
+    Reduces a SQL statement to its shape, so statements that only differ in
+    their values are counted together.
+
+    Literals become ?, lists of values become (...), and whitespace is
+    collapsed (e.g. "SELECT * FROM product WHERE code IN (?, ?)" and the
+    same query with three codes share "SELECT * FROM product WHERE code IN (...)").
+
+    Args:
+        statement (str): The SQL statement.
+
+    Returns:
+        tuple: The normalized statement and a short hash of it.
+    """
+    shape = _string_literal.sub('?', statement)
+    shape = _number_literal.sub('?', shape)
+    shape = re.sub(r'%\(\w+\)s|%s|\$\d+', '?', shape)
+    shape = _placeholder_list.sub('(...)', shape)
+    shape = _whitespace.sub(' ', shape).strip()
+    return shape, hashlib.md5(shape.encode()).hexdigest()[:12]
+
+def _percentile(values, share):
+    # values must be sorted
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0
+
+class RequestProfiler:
+    """
+    Collects the timings of the requests of one process.
+
+    Args:
+        window (int): The number of recent requests kept per endpoint.
+        slow_query_ms (float): Statements slower than this are logged.
+        max_fingerprints (int): The number of distinct slow statements kept.
+    """
+
+    def __init__(self, window=1000, slow_query_ms=100, max_fingerprints=500):
+        self.window = window
+        self.slow_query_ms = slow_query_ms
+        self.max_fingerprints = max_fingerprints
+        self._samples = {}
+        self._slow_queries = {}
+        self._lock = threading.Lock()
+
+    def watch_engine(self, engine, logger):
+        """
+        Times the statements executed on an engine.
+
+        Args:
+            engine (Engine): The engine.
+            logger (Logger): Where slow statements are logged.
+        """
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('profiling_started', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = (time.perf_counter() - conn.info['profiling_started'].pop()) * 1000
+            if has_request_context() and 'profile' in g:
+                g.profile['queries'] += 1
+                g.profile['db'] += elapsed
+            if elapsed >= self.slow_query_ms:
+                self.slow_query(statement, elapsed, logger)
+
+    def slow_query(self, statement, elapsed, logger):
+        shape, key = fingerprint(statement)
+        endpoint = request.endpoint if has_request_context() else None
+        logger.warning('Slow query %s (%.1f ms, %s): %s', key, elapsed, endpoint or 'no request', shape)
+        with self._lock:
+            entry = self._slow_queries.get(key)
+            if entry is None:
+                if len(self._slow_queries) >= self.max_fingerprints:
+                    return
+                entry = self._slow_queries[key] = {
+                    'fingerprint': key, 'statement': shape, 'count': 0, 'total_ms': 0, 'max_ms': 0,
+                    'endpoints': set()
+                }
+            entry['count'] += 1
+            entry['total_ms'] += elapsed
+            entry['max_ms'] = max(entry['max_ms'], elapsed)
+            if endpoint:
+                entry['endpoints'].add(endpoint)
+
+    def template_started(self, sender, template, context, **extra):
+        if 'profile' in g:
+            g.profile['templates'].append(time.perf_counter())
+
+    def template_finished(self, sender, template, context, **extra):
+        # Templates rendered from inside a template are already part of the outer time
+        if 'profile' in g and g.profile['templates']:
+            started = g.profile['templates'].pop()
+            if not g.profile['templates']:
+                g.profile['template'] += (time.perf_counter() - started) * 1000
+
+    def request_started(self):
+        g.profile = {'started': time.perf_counter(), 'queries': 0, 'db': 0, 'template': 0, 'templates': []}
+
+    def request_finished(self, response):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return response
+        total = (time.perf_counter() - profile['started']) * 1000
+        response.headers['Server-Timing'] = (
+            f"total;dur={total:.1f}, "
+            f"db;dur={profile['db']:.1f};desc=\"{profile['queries']} queries\", "
+            f"template;dur={profile['template']:.1f}"
+        )
+
+        endpoint = request.endpoint or 'unmatched'
+        sample = (total, profile['queries'], profile['db'], profile['template'])
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if samples is None:
+                samples = self._samples[endpoint] = deque(maxlen=self.window)
+            samples.append(sample)
+        return response
+
+    def snapshot(self):
+        """
+        Summarizes the recent requests of every endpoint and the slow statements.
+
+        Returns:
+            dict: Per endpoint, the number of requests kept, the percentiles
+            and histogram of their wall time and their average query count,
+            SQL and template time; and the slow statements, slowest total first.
+        """
+        with self._lock:
+            samples = {endpoint: list(values) for endpoint, values in self._samples.items()}
+            slow_queries = [dict(entry, endpoints=sorted(entry['endpoints'])) for entry in self._slow_queries.values()]
+
+        endpoints = {}
+        for endpoint, values in samples.items():
+            totals = sorted(sample[0] for sample in values)
+            buckets = [0] * len(HISTOGRAM_BUCKETS)
+            for total in totals:
+                buckets[next(index for index, bound in enumerate(HISTOGRAM_BUCKETS) if total <= bound)] += 1
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'p50_ms': round(_percentile(totals, 0.5), 2),
+                'p95_ms': round(_percentile(totals, 0.95), 2),
+                'p99_ms': round(_percentile(totals, 0.99), 2),
+                'max_ms': round(totals[-1], 2),
+                'avg_queries': round(sum(sample[1] for sample in values) / len(values), 2),
+                'avg_db_ms': round(sum(sample[2] for sample in values) / len(values), 2),
+                'avg_template_ms': round(sum(sample[3] for sample in values) / len(values), 2),
+                # Requests per bucket, by the bucket's upper bound in ms
+                'histogram_ms': [
+                    {'le': '+Inf' if bound == float('inf') else bound, 'count': count}
+                    for bound, count in zip(HISTOGRAM_BUCKETS, buckets)
+                ]
+            }
+
+        for entry in slow_queries:
+            entry['total_ms'] = round(entry['total_ms'], 2)
+            entry['max_ms'] = round(entry['max_ms'], 2)
+        slow_queries.sort(key=lambda entry: entry['total_ms'], reverse=True)
+        return {'pid': os.getpid(), 'window': self.window, 'endpoints': endpoints, 'slow_queries': slow_queries}
+
+    def report(self):
+        # The /_profiling view; every worker process keeps its own numbers
+        return jsonify(self.snapshot())
@@ -0,0 +1,71 @@
+# queries.py
+
+from contextlib import contextmanager
+from sqlalchemy import event
+from . import db
+
+class QueryCounter:
+    """
+    The SQL statements executed while a count_queries() block runs.
+
+    Attributes:
+        statements (list): The SQL of every statement, in order.
+    """
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+@contextmanager
+def count_queries(engine=None):
+    """
+    Counts the SQL statements executed inside a with block.
+
+    Useful to check that a view loads its relationships eagerly, e.g.:
+
+        with count_queries() as queries:
+            client.get('/sales')
+        print(queries.count)
+
+    Args:
+        engine (Engine, optional): The engine to watch. Default is db.engine.
+
+    Yields:
+        QueryCounter: The statements executed so far.
+    """
+    engine = engine if engine is not None else db.engine
+    counter = QueryCounter()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+@contextmanager
+def assert_max_queries(limit, engine=None):
+    """
+    Fails if a with block executes more than a number of SQL statements.
+
+    Args:
+        limit (int): The largest number of statements allowed.
+        engine (Engine, optional): The engine to watch. Default is db.engine.
+
+    Yields:
+        QueryCounter: The statements executed so far.
+
+    Raises:
+        AssertionError: If the block executed more than limit statements.
+    """
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        raise AssertionError(
+            f'{counter.count} queries executed, expected at most {limit}:\n' + '\n'.join(counter.statements)
+        )
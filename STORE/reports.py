@@ -0,0 +1,191 @@
+# reports.py
+
+from datetime import timedelta
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import DailySales, Product, Sale
+
+def record_daily_sales(day, sold):
+    """
+    Adds the products sold by a checkout to their daily sales rows.
+
+    Rows are incremented in SQL and created when missing. Nothing is
+    committed; the change is part of the caller's transaction.
+
+    Args:
+        day (date): The day of the sale.
+        sold (iterable): (product, quantity) pairs, with the product's
+            prices as of the sale.
+    """
+    for product, quantity in sold:
+        revenue = product.selling_price * quantity
+        cost = product.buying_price * quantity
+        increment = (
+            update(DailySales)
+            .where(DailySales.day == day, DailySales.product_code == product.code)
+            .values(
+                units=DailySales.units + quantity,
+                revenue=DailySales.revenue + revenue,
+                cost=DailySales.cost + cost,
+                profit=DailySales.profit + revenue - cost
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.execute(increment).rowcount == 0:
+            # First sale of the product that day
+            try:
+                with db.session.begin_nested():
+                    db.session.add(DailySales(
+                        day=day,
+                        product_code=product.code,
+                        units=quantity,
+                        revenue=revenue,
+                        cost=cost,
+                        profit=revenue - cost
+                    ))
+            except IntegrityError:
+                # Another checkout created the row first
+                db.session.execute(increment)
+
+def _date_range_filter(column, start_date, end_date):
+    # Conditions of an inclusive date range on a Date or DateTime column, in a form indexes can use
+    conditions = []
+    if start_date:
+        conditions.append(column >= start_date)
+    if end_date:
+        conditions.append(column < end_date + timedelta(days=1))
+    return conditions
+
+def sales_report(start_date=None, end_date=None, product_codes=None):
+    """
+    Reads the sales of a date range per product from the daily rollup.
+
+    Args:
+        start_date (date, optional): First day of the range.
+        end_date (date, optional): Last day of the range, included.
+        product_codes (list, optional): Only report these products.
+
+    Returns:
+        list: Rows with the product code, item and category, and the
+        units, revenue, cost and profit of the range, best sellers first.
+    """
+    query = (
+        select(
+            DailySales.product_code,
+            Product.item,
+            Product.category,
+            func.sum(DailySales.units).label('units'),
+            func.sum(DailySales.revenue).label('revenue'),
+            func.sum(DailySales.cost).label('cost'),
+            func.sum(DailySales.profit).label('profit')
+        )
+        .join(Product, Product.code == DailySales.product_code)
+        .where(*_date_range_filter(DailySales.day, start_date, end_date))
+        .group_by(DailySales.product_code, Product.item, Product.category)
+        .order_by(func.sum(DailySales.revenue).desc(), DailySales.product_code)
+    )
+    if product_codes:
+        query = query.where(DailySales.product_code.in_(product_codes))
+    return db.session.execute(query).all()
+
+def sales_total(start_date=None, end_date=None, product_codes=None, session=None):
+    """
+    Reads the revenue of the sales in a date range from the daily rollup.
+
+    Reads one row per product per day instead of every Sale row, so the
+    total of the unfiltered sales listing stays cheap.
+
+    Args:
+        start_date (date, optional): First day of the range.
+        end_date (date, optional): Last day of the range, included.
+        product_codes (list, optional): Only count these products; an empty
+            list counts nothing. Default is every product.
+        session (Session, optional): The session to query. Default is db.session.
+
+    Returns:
+        float: The revenue, at the selling prices of the time of sale.
+    """
+    session = session if session is not None else db.session
+    query = select(func.coalesce(func.sum(DailySales.revenue), 0)).where(
+        *_date_range_filter(DailySales.day, start_date, end_date)
+    )
+    if product_codes is not None:
+        query = query.where(DailySales.product_code.in_(product_codes))
+    return session.execute(query).scalar()
+
+def _raw_daily_units(start_date=None, end_date=None):
+    # Units sold per (day, product) computed from the Sale rows
+    day = func.date(Sale.sale_date)
+    rows = db.session.execute(
+        select(day, Sale.product_code, func.sum(Sale.quantity_sold))
+        .where(*_date_range_filter(Sale.sale_date, start_date, end_date))
+        .group_by(day, Sale.product_code)
+    ).all()
+    return {(str(row[0]), row[1]): row[2] for row in rows}
+
+def verify_daily_sales(start_date=None, end_date=None):
+    """
+    Compares the daily sales rollup with the Sale rows.
+
+    Only units are compared: revenue and cost keep the prices of the time
+    of sale, which Sale rows do not record.
+
+    Args:
+        start_date (date, optional): First day to check.
+        end_date (date, optional): Last day to check, included.
+
+    Returns:
+        list: (day, product code) keys whose units have drifted.
+    """
+    expected = _raw_daily_units(start_date, end_date)
+    stored = {
+        (str(row.day), row.product_code): row.units
+        for row in db.session.execute(
+            select(DailySales.day, DailySales.product_code, DailySales.units)
+            .where(*_date_range_filter(DailySales.day, start_date, end_date))
+        )
+    }
+    return [
+        key for key in sorted(set(expected) | set(stored))
+        if expected.get(key, 0) != stored.get(key, 0)
+    ]
+
+def rebuild_daily_sales(start_date=None, end_date=None, session=None):
+    """
+    Rebuilds the daily sales rollup of a date range from the Sale rows.
+
+    Sale rows do not record prices, so the rebuilt revenue and cost use
+    the current prices of the products.
+
+    Args:
+        start_date (date, optional): First day to rebuild.
+        end_date (date, optional): Last day to rebuild, included.
+        session (Session, optional): The session to write with. Default is db.session.
+
+    Returns:
+        int: The number of rows written.
+    """
+    session = session if session is not None else db.session
+    day = func.date(Sale.sale_date)
+    units = func.sum(Sale.quantity_sold)
+    rollup = (
+        select(
+            day,
+            Sale.product_code,
+            units,
+            units * Product.selling_price,
+            units * Product.buying_price,
+            units * (Product.selling_price - Product.buying_price)
+        )
+        .join(Product, Product.code == Sale.product_code)
+        .where(*_date_range_filter(Sale.sale_date, start_date, end_date))
+        .group_by(day, Sale.product_code, Product.selling_price, Product.buying_price)
+    )
+
+    session.execute(delete(DailySales).where(*_date_range_filter(DailySales.day, start_date, end_date)))
+    result = session.execute(insert(DailySales).from_select(
+        ['day', 'product_code', 'units', 'revenue', 'cost', 'profit'], rollup
+    ))
+    session.commit()
+    return result.rowcount
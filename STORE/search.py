@@ -0,0 +1,168 @@
+# search.py
+
+import re
+from flask import current_app
+from sqlalchemy import and_, event, inspect, or_, text
+from . import db
+from .metrics import search_duration
+from .models import Product
+from .pagination import DEFAULT_PAGE_SIZE, keyset_page, split_page
+
+# Product columns covered by the full-text search index
+search_columns = ('item', 'type_material', 'size', 'color', 'description')
+
+# The index is an SQLite FTS5 table kept in sync with the product table by triggers.
+# The code column is indexed too so the triggers can find the row to delete.
+search_index_ddl = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(
+        code, item, type_material, size, color, description,
+        tokenize = 'unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_insert AFTER INSERT ON product BEGIN
+        INSERT INTO product_fts (code, item, type_material, size, color, description)
+        VALUES (new.code, new.item, new.type_material, new.size, new.color, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_delete AFTER DELETE ON product BEGIN
+        DELETE FROM product_fts
+        WHERE product_fts MATCH 'code:"' || replace(old.code, '"', '""') || '"' AND code = old.code;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS product_fts_update
+    AFTER UPDATE OF code, item, type_material, size, color, description ON product BEGIN
+        DELETE FROM product_fts
+        WHERE product_fts MATCH 'code:"' || replace(old.code, '"', '""') || '"' AND code = old.code;
+        INSERT INTO product_fts (code, item, type_material, size, color, description)
+        VALUES (new.code, new.item, new.type_material, new.size, new.color, new.description);
+    END
+    """
+)
+
+_search_index_ready = False
+_fallback_logged = False
+
+@event.listens_for(Product.__table__, 'after_create')
+def create_search_index(target, connection, **kw):
+    # Create the index together with the product table (SQLite only)
+    if connection.dialect.name == 'sqlite':
+        for statement in search_index_ddl:
+            connection.exec_driver_sql(statement)
+
+def rebuild_search_index():
+    """
+    Creates the search index if needed and refills it from the products.
+
+    Returns:
+        int: The number of products indexed.
+    """
+    global _search_index_ready
+    with db.engine.begin() as connection:
+        create_search_index(Product.__table__, connection)
+        connection.exec_driver_sql('DELETE FROM product_fts')
+        result = connection.exec_driver_sql(
+            'INSERT INTO product_fts (code, item, type_material, size, color, description) '
+            'SELECT code, item, type_material, size, color, description FROM product'
+        )
+    _search_index_ready = True
+    return result.rowcount
+
+def search_index_available():
+    """
+    Checks whether the full-text search index can be used.
+
+    Returns:
+        bool: True if the database is SQLite and the index table exists.
+    """
+    global _search_index_ready
+    if not _search_index_ready and db.engine.dialect.name == 'sqlite':
+        _search_index_ready = inspect(db.engine).has_table('product_fts')
+    return _search_index_ready
+
+def build_match_query(search_term):
+    """
+    Turns a search term into an FTS5 query.
+
+    Every word of the term must match the start of a word in one of the
+    search columns, so 'blu cot' finds 'Blue cotton shirt'.
+
+    Args:
+        search_term (str): The text typed by the user.
+
+    Returns:
+        str: The FTS5 query, or None if the term has no words.
+    """
+    tokens = re.findall(r'\w+', search_term.lower())
+    if not tokens:
+        return None
+    terms = ' '.join(f'"{token}"*' for token in tokens)
+    return f"{{{' '.join(search_columns)}}} : ({terms})"
+
+def search_products(search_term, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Finds one page of the products matching a search term, best matches first.
+
+    Uses the full-text search index when it is available and falls back to
+    substring matching, ordered by code, otherwise.
+
+    Args:
+        search_term (str): The text typed by the user.
+        cursor (str, optional): The next_cursor returned with the previous page.
+        limit (int, optional): The page size.
+
+    Returns:
+        tuple: The matching Product objects and the cursor of the next page.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+    """
+    global _fallback_logged
+    method = 'index' if search_index_available() else 'substring'
+    if method == 'substring' and not _fallback_logged:
+        # Once per process; search_duration counts every search by method
+        _fallback_logged = True
+        current_app.logger.warning(
+            'No full-text search index: searching products with a full scan. '
+            'On SQLite, create the index with `flask --app STORE init-db`.'
+        )
+    with search_duration.labels(method).time():
+        return _search_products(search_term, cursor, limit, method == 'index')
+
+def _search_products(search_term, cursor, limit, use_index):
+    if not use_index:
+        query = Product.query.filter(
+            or_(*(getattr(Product, column).ilike(f'%{search_term}%') for column in search_columns))
+        )
+        return keyset_page(query, cursor, limit)
+
+    match_query = build_match_query(search_term)
+    if match_query is None:
+        return keyset_page(Product.query, cursor, limit)
+
+    ranked = (
+        text('SELECT code, rank FROM product_fts WHERE product_fts MATCH :query')
+        .bindparams(query=match_query)
+        .columns(code=db.String, rank=db.Float)
+        .subquery()
+    )
+    query = Product.query.add_columns(ranked.c.rank).join(ranked, ranked.c.code == Product.code)
+
+    # Ranked pages continue after the (rank, code) of the last product
+    if cursor:
+        try:
+            last_rank, last_code = cursor.split('|', 1)
+            last_rank = float(last_rank)
+        except ValueError:
+            raise ValueError('Invalid cursor')
+        query = query.filter(or_(
+            ranked.c.rank > last_rank,
+            and_(ranked.c.rank == last_rank, Product.code > last_code)
+        ))
+
+    rows = query.order_by(ranked.c.rank, Product.code).limit(limit + 1).all()
+    rows, next_cursor = split_page(rows, limit, lambda row: f'{row.rank!r}|{row.Product.code}')
+    return [row.Product for row in rows], next_cursor
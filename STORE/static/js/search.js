@@ -20,88 +20,125 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 2000);
     });
 
+    const loadMoreButton = document.getElementById('loadMoreButton');
+
+    // Search results arrive one page at a time; groups split across pages are merged
+    let searchTermInUse = '';
+    let searchCursor = null;
+    let searchGroups = new Map();
+
+    function renderSearchResults() {
+        const products = Array.from(searchGroups.values());
+        productTableBody.innerHTML = '';
+        if (products.length > 0) {
+            let grandTotalQuantity = 0;
+            let grandTotalBuyingPrice = 0;
+            let grandTotalSellingPrice = 0;
+            let grandTotalProfit = 0;
+
+            products.forEach(group => {
+                const category = group.category;
+                const item = group.item;
+                const formattedCode = group.products[0].code.replace(/ /g, '_').replace(/-/g, '_');
+                const totalQuantity = group.products.reduce((sum, product) => sum + product.quantity, 0);
+                const totalBuyingPrice = group.products.reduce((sum, product) => sum + (product.buying_price * product.quantity), 0);
+                const totalSellingPrice = group.products.reduce((sum, product) => sum + (product.selling_price * product.quantity), 0);
+                const totalProfit = group.products.reduce((sum, product) => sum + (product.profit * product.quantity), 0);
+
+                grandTotalQuantity += totalQuantity;
+                grandTotalBuyingPrice += totalBuyingPrice;
+                grandTotalSellingPrice += totalSellingPrice;
+                grandTotalProfit += totalProfit;
+
+                const row = `
+                    <tr>
+                        <td>${item}</td>
+                        <td>${category}</td>
+                        <td>${totalQuantity}</td>
+                        <td>${totalBuyingPrice.toFixed(2)}</td>
+                        <td>${totalSellingPrice.toFixed(2)}</td>
+                        <td>${totalProfit.toFixed(2)}</td>
+                        <td><button class="btn btn-info toggle-button" data-code="${formattedCode}">Expand</button></td>
+                    </tr>
+                    <tr id="items_${formattedCode}" class="nested-table-container d-none">
+                        <td colspan="7"></td>
+                    </tr>
+                `;
+                productTableBody.insertAdjacentHTML('beforeend', row);
+            });
+
+            const totalsRow = `
+                <tr>
+                    <td colspan="2"><strong>Totals</strong></td>
+                    <td><strong>${grandTotalQuantity}</strong></td>
+                    <td><strong>${grandTotalBuyingPrice.toFixed(2)}</strong></td>
+                    <td><strong>${grandTotalSellingPrice.toFixed(2)}</strong></td>
+                    <td><strong>${grandTotalProfit.toFixed(2)}</strong></td>
+                    <td></td>
+                </tr>
+            `;
+            productTableBody.insertAdjacentHTML('beforeend', totalsRow);
+
+            noResultsMessage.classList.add('d-none');
+        } else {
+            noResultsMessage.classList.remove('d-none');
+        }
+        if (loadMoreButton) {
+            loadMoreButton.classList.toggle('d-none', !searchCursor);
+        }
+    }
+
+    function fetchSearchPage() {
+        fetch('/filter_products', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ search_term: searchTermInUse, cursor: searchCursor }),
+        })
+        .then(response => response.json())
+        .then(data => {
+            console.log('Filtered products data:', data);
+            data.products.forEach(group => {
+                const key = `${group.category}___${group.item}`;
+                if (searchGroups.has(key)) {
+                    searchGroups.get(key).products.push(...group.products);
+                } else {
+                    searchGroups.set(key, group);
+                }
+            });
+            searchCursor = data.next_cursor;
+            renderSearchResults();
+        })
+        .catch(error => {
+            console.error('Error fetching filtered products:', error);
+        });
+    }
+
     if (searchButton && searchInput) {
         searchButton.addEventListener('click', () => {
             console.log('Search button clicked');
             const searchTerm = searchInput.value.trim().toLowerCase();
             console.log('Search term:', searchTerm);
             if (searchTerm) {
-                fetch('/filter_products', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({ search_term: searchTerm }),
-                })
-                .then(response => response.json())
-                .then(data => {
-                    console.log('Filtered products data:', data);
-                    const { products } = data;
-                    productTableBody.innerHTML = '';
-                    if (products.length > 0) {
-                        let grandTotalQuantity = 0;
-                        let grandTotalBuyingPrice = 0;
-                        let grandTotalSellingPrice = 0;
-                        let grandTotalProfit = 0;
-
-                        products.forEach(group => {
-                            const category = group.category;
-                            const item = group.item;
-                            const formattedCode = group.products[0].code.replace(/ /g, '_').replace(/-/g, '_');
-                            const totalQuantity = group.products.reduce((sum, product) => sum + product.quantity, 0);
-                            const totalBuyingPrice = group.products.reduce((sum, product) => sum + (product.buying_price * product.quantity), 0);
-                            const totalSellingPrice = group.products.reduce((sum, product) => sum + (product.selling_price * product.quantity), 0);
-                            const totalProfit = group.products.reduce((sum, product) => sum + (product.profit * product.quantity), 0);
-
-                            grandTotalQuantity += totalQuantity;
-                            grandTotalBuyingPrice += totalBuyingPrice;
-                            grandTotalSellingPrice += totalSellingPrice;
-                            grandTotalProfit += totalProfit;
-
-                            const row = `
-                                <tr>
-                                    <td>${item}</td>
-                                    <td>${category}</td>
-                                    <td>${totalQuantity}</td>
-                                    <td>${totalBuyingPrice.toFixed(2)}</td>
-                                    <td>${totalSellingPrice.toFixed(2)}</td>
-                                    <td>${totalProfit.toFixed(2)}</td>
-                                    <td><button class="btn btn-info toggle-button" data-code="${formattedCode}">Expand</button></td>
-                                </tr>
-                                <tr id="items_${formattedCode}" class="nested-table-container d-none">
-                                    <td colspan="7"></td>
-                                </tr>
-                            `;
-                            productTableBody.insertAdjacentHTML('beforeend', row);
-                        });
-
-                        const totalsRow = `
-                            <tr>
-                                <td colspan="2"><strong>Totals</strong></td>
-                                <td><strong>${grandTotalQuantity}</strong></td>
-                                <td><strong>${grandTotalBuyingPrice.toFixed(2)}</strong></td>
-                                <td><strong>${grandTotalSellingPrice.toFixed(2)}</strong></td>
-                                <td><strong>${grandTotalProfit.toFixed(2)}</strong></td>
-                                <td></td>
-                            </tr>
-                        `;
-                        productTableBody.insertAdjacentHTML('beforeend', totalsRow);
-
-                        noResultsMessage.classList.add('d-none');
-                    } else {
-                        noResultsMessage.classList.remove('d-none');
-                    }
-                    attachToggleEventListeners();
-                })
-                .catch(error => {
-                    console.error('Error fetching filtered products:', error);
-                });
+                searchTermInUse = searchTerm;
+                searchCursor = null;
+                searchGroups = new Map();
+                fetchSearchPage();
             }
         });
     } else {
         console.error('Search input or button not found');
     }
 
+    if (loadMoreButton) {
+        loadMoreButton.addEventListener('click', () => {
+            if (searchCursor) {
+                fetchSearchPage();
+            }
+        });
+    }
+
     if (addDataButton) {
         addDataButton.addEventListener('click', function() {
             console.log('Add Data button clicked');
@@ -114,7 +151,8 @@ document.addEventListener('DOMContentLoaded', function() {
                 })
                 .then(data => {
                     console.log('Add data response:', data);
-                    alert(data.message);
+                    addDataButton.disabled = true;
+                    pollImportJob(data.status_url);
                 })
                 .catch(error => {
                     console.error('Error adding data to database:', error);
@@ -125,121 +163,178 @@ document.addEventListener('DOMContentLoaded', function() {
         console.error('Add Data button not found');
     }
 
-    function attachToggleEventListeners() {
-        console.log('Attaching toggle event listeners');
-        const toggleButtons = document.querySelectorAll('.toggle-button');
-        toggleButtons.forEach(button => {
-            console.log('Attaching event listener to button:', button);
-            button.addEventListener('click', (event) => {
-                console.log('Toggle button clicked');
-                const code = event.target.getAttribute('data-code');
-                console.log('Code:', code);
-                const nestedTableContainer = document.getElementById(`items_${code}`);
-                console.log('Nested table container:', nestedTableContainer);
-                if (nestedTableContainer) {
-                    nestedTableContainer.classList.toggle('d-none');
-                    if (!nestedTableContainer.classList.contains('d-none')) {
-                        fetch('/expand_items', {
-                            method: 'POST',
-                            headers: {
-                                'Content-Type': 'application/json',
-                            },
-                            body: JSON.stringify({ item: code }),
-                        })
-                        .then(response => {
-                            if (!response.ok) {
-                                throw new Error('Network response was not ok');
-                            }
-                            return response.json();
-                        })
-                        .then(data => {
-                            console.log('Expanded items data:', data);
-                            const { products } = data;
-                            const totalNestedBuyingPrice = products.reduce((sum, product) => sum + product.buying_price, 0);
-                            const totalNestedSellingPrice = products.reduce((sum, product) => sum + product.selling_price, 0);
-                            const totalNestedProfit = products.reduce((sum, product) => sum + product.profit, 0);
-                            const nestedTableContent = products.map(product => `
-                                <tr>
-                                    <td>${product.code}</td>
-                                    <td>${product.size}</td>
-                                    <td>${product.type_material}</td>
-                                    <td>${product.color}</td>
-                                    <td>${product.description}</td>
-                                    <td>${product.buying_price}</td>
-                                    <td>${product.selling_price}</td>
-                                    <td>${product.profit}</td>
-                                    <td>
-                                        <button class="btn btn-warning update-button" data-code="${product.code}">Update</button>
-                                        <button class="btn btn-danger delete-button" data-code="${product.code}">Delete</button>
-                                    </td>
-                                </tr>
-                            `).join('');
-                            nestedTableContainer.querySelector('td').innerHTML = `
-                                <table class="table table-bordered">
-                                    <thead>
-                                        <tr>
-                                            <th>Code</th>
-                                            <th>Size</th>
-                                            <th>Type Material</th>
-                                            <th>Color</th>
-                                            <th>Description</th>
-                                            <th>Buying Price</th>
-                                            <th>Selling Price</th>
-                                            <th>Profit</th>
-                                            <th>Actions</th>
-                                        </tr>
-                                    </thead>
-                                    <tbody>
-                                        ${nestedTableContent}
-                                    </tbody>
-                                    <tfoot>
-                                        <tr>
-                                            <td colspan="5"><strong>Totals</strong></td>
-                                            <td><strong>${totalNestedBuyingPrice.toFixed(2)}</strong></td>
-                                            <td><strong>${totalNestedSellingPrice.toFixed(2)}</strong></td>
-                                            <td><strong>${totalNestedProfit.toFixed(2)}</strong></td>
-                                            <td></td>
-                                        </tr>
-                                    </tfoot>
-                                </table>
-                            `;
-                            attachUpdateDeleteEventListeners();
-                        })
-                        .catch(error => {
-                            console.error('Error expanding items:', error);
-                        });
-                    }
+    // The import runs in the background; check its progress every second
+    function pollImportJob(statusUrl) {
+        fetch(statusUrl)
+            .then(response => response.json())
+            .then(job => {
+                console.log('Import job:', job);
+                if (job.status === 'queued' || job.status === 'running') {
+                    const eta = job.eta_seconds !== null ? ` (about ${Math.ceil(job.eta_seconds)}s left)` : '';
+                    addDataButton.textContent = `Importing ${job.rows_processed}/${job.total_rows || '?'}${eta}`;
+                    setTimeout(() => pollImportJob(statusUrl), 1000);
+                    return;
+                }
+                addDataButton.disabled = false;
+                addDataButton.textContent = 'Add Data to Database';
+                if (job.status === 'finished') {
+                    alert(`Data added to database: ${job.report.inserted} added, ${job.report.updated} updated, ${job.rows_failed} failed`);
                 } else {
-                    console.error(`Nested table container with ID items_${code} not found`);
+                    alert(`Error adding data to database: ${job.error}`);
                 }
+            })
+            .catch(error => {
+                console.error('Error checking import job:', error);
+                addDataButton.disabled = false;
             });
-        });
     }
 
-    function attachUpdateDeleteEventListeners() {
-        console.log('Attaching update and delete event listeners');
-        const updateButtons = document.querySelectorAll('.update-button');
-        const deleteButtons = document.querySelectorAll('.delete-button');
+    // An expanded group shows one page of products; "Show more" appends the next page
+    const nestedCursors = new Map();
+    const nestedTotals = new Map();
 
-        updateButtons.forEach(button => {
-            button.addEventListener('click', (event) => {
-                console.log('Update button clicked');
-                const code = event.target.getAttribute('data-code');
-                // Add your update logic here
-            });
+    function nestedRows(products) {
+        return products.map(product => `
+            <tr>
+                <td>${product.code}</td>
+                <td>${product.size}</td>
+                <td>${product.type_material}</td>
+                <td>${product.color}</td>
+                <td>${product.description}</td>
+                <td>${product.buying_price}</td>
+                <td>${product.selling_price}</td>
+                <td>${product.profit}</td>
+                <td>
+                    <button class="btn btn-warning update-button" data-code="${product.code}">Update</button>
+                    <button class="btn btn-danger delete-button" data-code="${product.code}">Delete</button>
+                </td>
+            </tr>
+        `).join('');
+    }
+
+    function renderNestedTable(nestedTableContainer, code) {
+        nestedTableContainer.querySelector('td').innerHTML = `
+            <table class="table table-bordered">
+                <thead>
+                    <tr>
+                        <th>Code</th>
+                        <th>Size</th>
+                        <th>Type Material</th>
+                        <th>Color</th>
+                        <th>Description</th>
+                        <th>Buying Price</th>
+                        <th>Selling Price</th>
+                        <th>Profit</th>
+                        <th>Actions</th>
+                    </tr>
+                </thead>
+                <tbody class="nested-rows"></tbody>
+                <tfoot>
+                    <tr>
+                        <td colspan="5"><strong>Totals</strong></td>
+                        <td><strong class="nested-buying-total"></strong></td>
+                        <td><strong class="nested-selling-total"></strong></td>
+                        <td><strong class="nested-profit-total"></strong></td>
+                        <td><button class="btn btn-secondary btn-sm nested-more-button d-none" data-code="${code}">Show more</button></td>
+                    </tr>
+                </tfoot>
+            </table>
+        `;
+    }
+
+    function appendNestedRows(nestedTableContainer, code, products) {
+        // Only the new rows are added to the table; the totals of the loaded rows are kept up to date
+        nestedTableContainer.querySelector('.nested-rows').insertAdjacentHTML('beforeend', nestedRows(products));
+        const totals = nestedTotals.get(code);
+        products.forEach(product => {
+            totals.buying += product.buying_price;
+            totals.selling += product.selling_price;
+            totals.profit += product.profit;
+        });
+        nestedTableContainer.querySelector('.nested-buying-total').textContent = totals.buying.toFixed(2);
+        nestedTableContainer.querySelector('.nested-selling-total').textContent = totals.selling.toFixed(2);
+        nestedTableContainer.querySelector('.nested-profit-total').textContent = totals.profit.toFixed(2);
+    }
+
+    function loadNestedPage(code, cursor) {
+        const nestedTableContainer = document.getElementById(`items_${code}`);
+        const moreButton = nestedTableContainer.querySelector('.nested-more-button');
+        if (moreButton) {
+            moreButton.disabled = true;
+        }
+        fetch('/expand_items', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ item: code, cursor: cursor }),
+        })
+        .then(response => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        })
+        .then(data => {
+            console.log('Expanded items data:', data);
+            if (!cursor) {
+                renderNestedTable(nestedTableContainer, code);
+                nestedTotals.set(code, { buying: 0, selling: 0, profit: 0 });
+            }
+            appendNestedRows(nestedTableContainer, code, data.products);
+            nestedCursors.set(code, data.next_cursor);
+            const button = nestedTableContainer.querySelector('.nested-more-button');
+            button.disabled = false;
+            button.classList.toggle('d-none', !data.next_cursor);
+        })
+        .catch(error => {
+            console.error('Error expanding items:', error);
+            if (moreButton) {
+                moreButton.disabled = false;
+            }
         });
+    }
 
-        deleteButtons.forEach(button => {
-            button.addEventListener('click', (event) => {
-                console.log('Delete button clicked');
-                const code = event.target.getAttribute('data-code');
+    function toggleGroup(code) {
+        const nestedTableContainer = document.getElementById(`items_${code}`);
+        console.log('Nested table container:', nestedTableContainer);
+        if (!nestedTableContainer) {
+            console.error(`Nested table container with ID items_${code} not found`);
+            return;
+        }
+        nestedTableContainer.classList.toggle('d-none');
+        if (!nestedTableContainer.classList.contains('d-none')) {
+            // Every expand starts again from the first page
+            loadNestedPage(code, null);
+        }
+    }
+
+    // One listener on the table handles the buttons of every row, including rows added later
+    if (productTableBody) {
+        productTableBody.addEventListener('click', (event) => {
+            const button = event.target.closest('button');
+            if (!button) {
+                return;
+            }
+            const code = button.getAttribute('data-code');
+            if (button.classList.contains('toggle-button')) {
+                console.log('Toggle button clicked:', code);
+                toggleGroup(code);
+            } else if (button.classList.contains('nested-more-button')) {
+                const cursor = nestedCursors.get(code);
+                if (cursor) {
+                    loadNestedPage(code, cursor);
+                }
+            } else if (button.classList.contains('update-button')) {
+                console.log('Update button clicked:', code);
+                // Add your update logic here
+            } else if (button.classList.contains('delete-button')) {
+                console.log('Delete button clicked:', code);
                 // Add your delete logic here
-            });
+            }
         });
     }
 
-    attachToggleEventListeners();
-    
     const prefixes = {
         'SC': { item: 'shirt', category: 'casual' },
         'SO': { item: 'shirt', category: 'official' },
@@ -16,29 +16,106 @@ prefixes = {
     'vest': 'VST'
 }
 
-# Function to generate the tag
-def generate_tag(category, subcategory=None, item_code=1):
+class PrefixIndex:
     """
-    Generates a unique tag for a product based on its category and subcategory.
+    Longest-prefix-match index of product code prefixes, compiled once.
+
+    Prefixes are grouped by length, so resolving a code takes one dict
+    lookup per distinct prefix length (at most four) instead of a scan of
+    every prefix.
+
+    Args:
+        prefixes (dict): The category and subcategory prefixes (see prefixes above).
+    """
+
+    def __init__(self, prefixes):
+        # prefix -> (item, category); category is '' for items without subcategories
+        self.by_prefix = {}
+        # (item, category) -> prefix, the reverse index
+        self.by_item = {}
+        for item, prefix_data in prefixes.items():
+            if isinstance(prefix_data, dict):
+                for category, prefix in prefix_data.items():
+                    self.by_prefix[prefix] = (item, category)
+                    self.by_item[(item, category)] = prefix
+            else:
+                self.by_prefix[prefix_data] = (item, '')
+                self.by_item[(item, '')] = prefix_data
+        self.lengths = sorted({len(prefix) for prefix in self.by_prefix}, reverse=True)
+
+    def match(self, code):
+        """
+        Finds the longest prefix of a code.
+
+        Args:
+            code (str): The product code or code prefix (e.g., 'TSC0012').
+
+        Returns:
+            str: The matching prefix, or None if no prefix matches.
+        """
+        by_prefix = self.by_prefix
+        for length in self.lengths:
+            prefix = code[:length]
+            if prefix in by_prefix:
+                return prefix
+        return None
+
+    def resolve(self, code):
+        """
+        Resolves a code to the item and category of its longest prefix.
+
+        Args:
+            code (str): The product code or code prefix (e.g., 'TSC0012').
+
+        Returns:
+            tuple: The item and category (e.g., ('tshirt', 'casual')), or None.
+        """
+        prefix = self.match(code)
+        return self.by_prefix[prefix] if prefix else None
+
+# Compiled once at import and shared by code generation, imports and barcode handling
+prefix_index = PrefixIndex(prefixes)
+
+# Function to look up the prefix of a category
+def get_prefix(category, subcategory=None):
+    """
+    Returns the code prefix of a product category and subcategory.
 
     Args:
         category (str): The category of the product (e.g., 'shirt', 'tie').
         subcategory (str, optional): The subcategory of the product (e.g., 'casual', 'official'). Default is None.
-        item_code (int): The unique code for the item within its category and subcategory. Default is 1.
 
     Returns:
-        str: The generated product tag.
+        str: The code prefix (e.g., 'SC').
 
     Raises:
         ValueError: If the category or subcategory is invalid.
     """
     if category in prefixes:
         if isinstance(prefixes[category], dict):
-            if subcategory and subcategory in prefixes[category]:
-                return f"{prefixes[category][subcategory]}{item_code:04d}"
+            if subcategory and (category, subcategory) in prefix_index.by_item:
+                return prefix_index.by_item[(category, subcategory)]
             else:
                 raise ValueError(f"Invalid subcategory for {category}")
         else:
-            return f"{prefixes[category]}{item_code:04d}"
+            return prefix_index.by_item[(category, '')]
     else:
         raise ValueError("Invalid category")
+
+# Function to generate the tag
+def generate_tag(category, subcategory=None, item_code=1):
+    """
+    Generates a unique tag for a product based on its category and subcategory.
+
+    Args:
+        category (str): The category of the product (e.g., 'shirt', 'tie').
+        subcategory (str, optional): The subcategory of the product (e.g., 'casual', 'official'). Default is None.
+        item_code (int): The unique code for the item within its category and subcategory. Default is 1.
+
+    Returns:
+        str: The generated product tag.
+
+    Raises:
+        ValueError: If the category or subcategory is invalid.
+    """
+    return f"{get_prefix(category, subcategory)}{item_code:04d}"
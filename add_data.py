@@ -1,30 +1,203 @@
 from STORE import db
 from STORE.models import Product
+from STORE.inventory import apply_summary_changes
+from STORE.codes import advance_code_sequences, reserve_codes
+from STORE.metrics import import_rows, import_seconds
+from STORE.utils import get_prefix
+from sqlalchemy import insert, select, update
+from types import SimpleNamespace
 import csv
+import time
+
+# Rows written per transaction
+IMPORT_CHUNK_SIZE = 1000
+
+# Text columns of a CSV row; rows without a code get the next code of their prefix
+text_columns = ('code', 'item', 'type_material', 'size', 'color', 'description')
+required_columns = ('item',)
+
+def parse_product_row(row):
+    """
+    Validates a CSV row and converts it to Product column values.
+
+    Args:
+        row (dict): The CSV row, with lower-case headers.
+
+    Returns:
+        dict: The column values of the product.
+
+    Raises:
+        ValueError: If a required value is missing or a number is invalid.
+    """
+    values = {column: (row.get(column) or '').strip() for column in text_columns}
+    missing = [column for column in required_columns if not values[column]]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}")
+
+    try:
+        buying_price = float(row.get('buying_price'))
+        selling_price = float(row.get('selling_price'))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid price')
+    try:
+        quantity = int(row.get('quantity'))
+    except (TypeError, ValueError):
+        raise ValueError('Invalid quantity')
+    if buying_price < 0 or selling_price < 0 or quantity < 0:
+        raise ValueError('Prices and quantity cannot be negative')
+
+    values.update(
+        category=(row.get('category') or '').strip(),
+        buying_price=buying_price,
+        selling_price=selling_price,
+        profit=selling_price - buying_price,
+        quantity=quantity
+    )
+    return values
+
+def import_chunk(rows):
+    """
+    Writes a chunk of parsed rows in one transaction.
+
+    Codes that already exist are updated, the others are inserted, and the
+    inventory summary is adjusted by the difference.
+
+    Args:
+        rows (dict): Parsed rows keyed by product code.
+
+    Returns:
+        tuple: The number of inserted and updated products.
+    """
+    existing = {
+        row.code: row
+        for row in db.session.execute(
+            select(
+                Product.code, Product.item, Product.category, Product.quantity,
+                Product.buying_price, Product.selling_price, Product.profit
+            ).where(Product.code.in_(rows))
+        )
+    }
+    new_rows = [row for code, row in rows.items() if code not in existing]
+    changed_rows = [row for code, row in rows.items() if code in existing]
 
-def add_products_from_csv(csv_file):
     try:
-        with open(csv_file, 'r', newline='') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                product = Product(
-                    code=row['code'],
-                    item=row['item'],
-                    category=row['category'],
-                    type_material=row['type_material'],
-                    size=row['size'],
-                    color=row['color'],
-                    description=row['description'],
-                    buying_price=float(row['buying_price']),
-                    selling_price=float(row['selling_price']),
-                    quantity=int(row['quantity'])
-                )
-                db.session.add(product)
+        changes = [(product, -1) for product in existing.values()]
+        changes += [(SimpleNamespace(**row), 1) for row in rows.values()]
+        if new_rows:
+            db.session.execute(insert(Product), new_rows)
+        if changed_rows:
+            db.session.execute(update(Product), changed_rows)
+        apply_summary_changes(changes)
+        advance_code_sequences(rows)
         db.session.commit()
-        print('Data added to database successfully')
-    except Exception as e:
-        print('Error adding data to database:', str(e))
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(new_rows), len(changed_rows)
+
+def add_products_from_csv(csv_file, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """
+    Imports products from a CSV file, one chunk of rows per transaction.
+
+    Rows are upserted by code: a code that already exists, or appears again
+    later in the file, replaces the product. Invalid rows are skipped and reported; a chunk that fails to
+    write is reported row by row without affecting the other chunks.
+
+    Args:
+        csv_file (str): Path of the CSV file.
+        chunk_size (int, optional): Rows written per transaction.
+        progress (callable, optional): Called with the report after every chunk.
+
+    Returns:
+        dict: The import report with the number of rows read, inserted,
+        updated and failed, the per-row errors and the throughput.
+    """
+    report = {'rows': 0, 'inserted': 0, 'updated': 0, 'failed': 0, 'errors': []}
+    started = time.perf_counter()
+
+    def fail(line, code, error):
+        report['failed'] += 1
+        import_rows.labels('failed').inc()
+        report['errors'].append({'line': line, 'code': code, 'error': error})
+
+    def with_prefixes(chunk):
+        # Rows without a code need the prefix of their item and category; the others are reported here
+        rows = []
+        for line, row in chunk:
+            prefix = None
+            if not row['code']:
+                try:
+                    prefix = get_prefix(row['item'].lower(), row['category'].lower() or None)
+                except ValueError as e:
+                    fail(line, None, str(e))
+                    continue
+            rows.append((line, row, prefix))
+        return rows
+
+    def assign_codes(rows):
+        # Reserve codes for rows without one, one block of numbers per prefix
+        uncoded = {}
+        for _, row, prefix in rows:
+            if prefix:
+                uncoded.setdefault(prefix, []).append(row)
+        for prefix, prefix_rows in uncoded.items():
+            for row, number in zip(prefix_rows, reserve_codes(prefix, len(prefix_rows))):
+                row['code'] = f'{prefix}{number:04d}'
+
+    def flush(chunk):
+        chunk_started = time.perf_counter()
+        # Rows reported by with_prefixes are left out of the write, so a failed write never reports them again
+        rows = with_prefixes(chunk)
+        try:
+            assign_codes(rows)
+            by_code = {row['code']: row for _, row, _ in rows}
+            inserted, updated = import_chunk(by_code)
+            # A code repeated in the chunk is upserted once with its last row; the earlier rows count
+            # as updates, as they would if the repeats were in different chunks
+            updated += len(rows) - len(by_code)
+            report['inserted'] += inserted
+            report['updated'] += updated
+            import_rows.labels('inserted').inc(inserted)
+            import_rows.labels('updated').inc(updated)
+        except Exception as e:
+            db.session.rollback()
+            for line, row, prefix in rows:
+                # Codes reserved for the chunk were rolled back with it
+                fail(line, None if prefix else row['code'], str(e))
+        import_seconds.inc(time.perf_counter() - chunk_started)
+        if progress:
+            progress(report)
+
+    with open(csv_file, 'r', newline='', encoding='utf-8-sig') as file:
+        reader = csv.DictReader(file)
+        # Accept headers in any case (e.g. 'Category')
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+
+        chunk = []
+        for row in reader:
+            report['rows'] += 1
+            try:
+                chunk.append((reader.line_num, parse_product_row(row)))
+            except ValueError as e:
+                fail(reader.line_num, row.get('code'), str(e))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    report['rows_per_second'] = round(report['rows'] / report['seconds']) if report['seconds'] else report['rows']
+    return report
 
 if __name__ == '__main__':
+    from STORE import create_app
+
+    app = create_app()
     csv_file = 'products.csv'  # Assuming your CSV file is named products.csv and is in the same directory
-    add_products_from_csv(csv_file)
+    with app.app_context():
+        report = add_products_from_csv(csv_file)
+    print(f"Imported {report['rows']} rows in {report['seconds']}s ({report['rows_per_second']} rows/s): "
+          f"{report['inserted']} inserted, {report['updated']} updated, {report['failed']} failed")
+    for error in report['errors']:
+        print(f"Line {error['line']} ({error['code']}): {error['error']}")
@@ -0,0 +1,94 @@
+"""
+Benchmarks the sales analytics against a naive ORM implementation.
+
+Seeds products and sales (a million by default) into a scratch database,
+rolls them up per day, then times the vectorized analytics and a loop
+over the Sale objects for a 90-day range.
+
+Usage: python benchmark_analytics.py [--sales 1000000] [--db benchmark_analytics.db]
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+from STORE.analytics import compute_analytics, load_sales_columns
+from STORE.models import DailySales, Product, Sale
+from benchmark_sales import seed
+
+def roll_up(session):
+    # The same rows 'flask rebuild-daily-sales' writes
+    day = func.date(Sale.sale_date)
+    units = func.sum(Sale.quantity_sold)
+    session.execute(insert(DailySales).from_select(
+        ['day', 'product_code', 'units', 'revenue', 'cost', 'profit'],
+        select(
+            day, Sale.product_code, units, units * Product.selling_price, units * Product.buying_price,
+            units * (Product.selling_price - Product.buying_price)
+        )
+        .join(Product, Product.code == Sale.product_code)
+        .group_by(day, Sale.product_code, Product.selling_price, Product.buying_price)
+    ))
+    session.commit()
+
+def naive_analytics(session, start_date, end_date, top):
+    # Load every sale and walk the objects, as a first implementation would
+    days = (end_date - start_date).days + 1
+    sales = session.query(Sale).filter(
+        Sale.sale_date >= start_date, Sale.sale_date < end_date + timedelta(days=1)
+    ).all()
+    products = {}
+    for sale in sales:
+        totals = products.setdefault(sale.product_code, {'product': sale.product, 'units': 0, 'revenue': 0, 'cost': 0})
+        totals['units'] += sale.quantity_sold
+        totals['revenue'] += sale.quantity_sold * sale.product.selling_price
+        totals['cost'] += sale.quantity_sold * sale.product.buying_price
+    categories = {}
+    for product in session.query(Product).all():
+        totals = products.get(product.code, {'units': 0, 'revenue': 0, 'cost': 0})
+        category = categories.setdefault(product.category or 'Others', {'units': 0, 'revenue': 0, 'cost': 0, 'stock': 0})
+        for name in ('units', 'revenue', 'cost'):
+            category[name] += totals[name]
+        category['stock'] += product.quantity
+        totals['stock_days'] = product.quantity / (totals['units'] / days) if totals['units'] else None
+    top_sellers = sorted(products.items(), key=lambda entry: -entry[1]['units'])[:top]
+    return top_sellers, categories
+
+def timed(name, function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    print(f'  {name:<40} {best * 1000:8.2f} ms')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sales', type=int, default=1000000, help='Number of sales to seed.')
+    parser.add_argument('--db', default='benchmark_analytics.db', help='Path of the scratch database.')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f'sqlite:///{args.db}')
+    started = time.perf_counter()
+    seed(engine, args.sales)
+    with Session(engine) as session:
+        roll_up(session)
+    print(f'Seeded and rolled up {args.sales} sales in {time.perf_counter() - started:.1f}s')
+
+    start_date, end_date = date(2023, 4, 1), date(2023, 6, 29)
+    days = (end_date - start_date).days + 1
+    with Session(engine) as session:
+        timed('vectorized (daily rollup + NumPy)',
+              lambda: compute_analytics(load_sales_columns(start_date, end_date, session), days))
+    with Session(engine) as session:
+        # A fresh identity map each time, as a request would have
+        timed('naive ORM loop over sales', lambda: (naive_analytics(session, start_date, end_date, 10), session.expunge_all()))
+
+    engine.dispose()
+    os.remove(args.db)
+
+if __name__ == '__main__':
+    main()
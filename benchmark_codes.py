@@ -0,0 +1,82 @@
+"""
+Benchmarks product code allocation against the size of the catalogue.
+
+Seeds catalogues of growing size into a scratch SQLite database and times
+allocating codes one transaction at a time, as add_product does, with the
+per-prefix sequence (next_product_code) and with the previous approach of
+counting the products of the group.
+
+Usage: python benchmark_codes.py [--sizes 1000 10000 100000] [--allocations 200] [--db benchmark_codes.db]
+"""
+import argparse
+import os
+import time
+from sqlalchemy import insert
+from STORE import create_app, db
+from STORE.codes import next_product_code
+from STORE.models import CodeSequence, Product
+from STORE.utils import generate_tag
+
+def seed(size):
+    db.drop_all()
+    db.create_all()
+    db.session.execute(insert(Product), [
+        {
+            'code': generate_tag('shirt', 'casual', number), 'item': 'shirt', 'category': 'casual',
+            'type_material': 'cotton', 'size': 'M', 'color': 'blue', 'description': 'benchmark',
+            'buying_price': 10, 'selling_price': 15, 'profit': 5, 'quantity': 1
+        }
+        for number in range(1, size + 1)
+    ])
+    db.session.commit()
+
+def allocate_by_count():
+    # The code add_product used to build: one more than the number of products in the group
+    number = Product.query.filter_by(item='shirt', category='casual').count() + 1
+    code = generate_tag('shirt', 'casual', number)
+    db.session.commit()
+    return code
+
+def allocate_by_sequence():
+    code = next_product_code('shirt', 'casual')
+    db.session.commit()
+    return code
+
+def timed(function, allocations):
+    started = time.perf_counter()
+    for _ in range(allocations):
+        function()
+    return (time.perf_counter() - started) / allocations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Catalogue sizes.')
+    parser.add_argument('--allocations', type=int, default=200, help='Codes allocated per run.')
+    parser.add_argument('--db', default='benchmark_codes.db', help='Path of the scratch database.')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.db)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}'})
+    print(f"{'products':>9} {'count + 1':>12} {'sequence':>12} {'first code':>12}")
+    with app.app_context():
+        for size in args.sizes:
+            seed(size)
+            by_count = timed(allocate_by_count, args.allocations)
+
+            # The first code of a prefix creates its sequence from the codes in use
+            db.session.query(CodeSequence).delete()
+            db.session.commit()
+            started = time.perf_counter()
+            allocate_by_sequence()
+            first = time.perf_counter() - started
+            by_sequence = timed(allocate_by_sequence, args.allocations)
+
+            print(f'{size:9d} {by_count * 1000:9.3f} ms {by_sequence * 1000:9.3f} ms {first * 1000:9.3f} ms')
+        db.engine.dispose()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmarks concurrent reads and writes on SQLite with different settings.
+
+Runs worker processes (as gunicorn would) that mix product reads and stock
+updates on a seeded database, once with SQLite's defaults and once with
+the PRAGMAs the app sets, and reports the throughput and the number of
+"database is locked" errors.
+
+Usage: python benchmark_database.py [--workers 4] [--seconds 5] [--db benchmark_database.db]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import time
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.exc import OperationalError
+from STORE import db
+from STORE.config import apply_sqlite_pragmas, database_config
+from STORE.models import Product
+
+PRODUCTS = 10000
+WRITE_SHARE = 0.2  # Share of the operations that update stock
+
+settings = {
+    'SQLite defaults': {},
+    'app settings': database_config({})['SQLITE_PRAGMAS']
+}
+
+def seed(path):
+    engine = create_engine(f'sqlite:///{path}')
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Product), [
+            {
+                'code': f'BM{number:05d}', 'item': 'shirt', 'category': 'casual', 'type_material': 'cotton',
+                'size': 'M', 'color': 'blue', 'description': 'benchmark', 'buying_price': 10,
+                'selling_price': 15, 'profit': 5, 'quantity': 100
+            }
+            for number in range(PRODUCTS)
+        ])
+    engine.dispose()
+
+def run_worker(path, pragmas, seconds):
+    engine = create_engine(f'sqlite:///{path}')
+    apply_sqlite_pragmas(engine, pragmas)
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        code = f'BM{random.randrange(PRODUCTS):05d}'
+        try:
+            if random.random() < WRITE_SHARE:
+                with engine.begin() as connection:
+                    connection.execute(
+                        update(Product).where(Product.code == code).values(quantity=Product.quantity + 1)
+                    )
+                counts['writes'] += 1
+            else:
+                with engine.connect() as connection:
+                    connection.execute(select(Product).where(Product.code == code)).one()
+                counts['reads'] += 1
+        except OperationalError:
+            counts['errors'] += 1
+    engine.dispose()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='Worker processes.')
+    parser.add_argument('--seconds', type=float, default=5, help='Duration of each run.')
+    parser.add_argument('--db', default='benchmark_database.db', help='Path of the scratch database.')
+    args = parser.parse_args()
+
+    for name, pragmas in settings.items():
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+        seed(args.db)
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.starmap(run_worker, [(args.db, pragmas, args.seconds)] * args.workers)
+        reads = sum(result['reads'] for result in results)
+        writes = sum(result['writes'] for result in results)
+        errors = sum(result['errors'] for result in results)
+        print(f'{name:<16} {reads / args.seconds:9.0f} reads/s {writes / args.seconds:8.0f} writes/s '
+              f'{errors:6d} lock errors ({args.workers} workers)')
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(args.db + suffix):
+            os.remove(args.db + suffix)
+
+if __name__ == '__main__':
+    main()
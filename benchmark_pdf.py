@@ -0,0 +1,98 @@
+"""
+Benchmarks invoice PDF rendering per backend.
+
+Seeds invoices into a scratch SQLite database and reports, for every PDF
+backend, the invoices rendered per second in this process and through the
+export worker pool (an export of every invoice, with a cold cache).
+Backends whose libraries are missing are reported as unavailable.
+
+Usage: python benchmark_pdf.py [--invoices 100] [--workers 2] [--db benchmark_pdf.db]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+from STORE import create_app, db
+from STORE.checkout import checkout
+from STORE.models import Invoice, InvoiceItem, Product
+from STORE.pdf import _invoice_pdf_job, invoice_resources, iter_invoice_pdfs, pdf_backends, render_pdf_file
+
+ITEMS_PER_INVOICE = 3
+
+def seed(invoices):
+    db.create_all()
+    db.session.execute(insert(Product), [
+        {
+            'code': f'BM{number:05d}', 'item': 'shirt', 'category': 'casual', 'type_material': 'cotton',
+            'size': 'M', 'color': 'blue', 'description': 'benchmark', 'buying_price': 10,
+            'selling_price': 15, 'profit': 5, 'quantity': 1000
+        }
+        for number in range(ITEMS_PER_INVOICE)
+    ])
+    db.session.commit()
+    codes = [f'BM{number:05d}' for number in range(ITEMS_PER_INVOICE)]
+    for _ in range(invoices):
+        checkout('Benchmark customer', '', codes)
+
+def in_process(backend, invoices, directory):
+    # Render every invoice one after the other in this process
+    started = time.perf_counter()
+    for invoice in invoices:
+        _, html, data, _ = _invoice_pdf_job(invoice, backend)
+        render_pdf_file(backend, html, data, os.path.join(directory, f'{invoice.id}.pdf'), invoice_resources())
+    return len(invoices) / (time.perf_counter() - started)
+
+def through_pool(backend, count, directory):
+    # A first export starts the workers and imports the backend in them; the second one is timed
+    for run in ('warm-up', 'timed'):
+        current_app.config['INVOICE_PDF_DIR'] = os.path.join(directory, f'{backend}-{run}')
+        started = time.perf_counter()
+        for _ in iter_invoice_pdfs(backend=backend, pool='export'):
+            pass
+    return count / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--invoices', type=int, default=100, help='Invoices to seed and render.')
+    parser.add_argument('--workers', type=int, default=2, help='Processes of the worker pool.')
+    parser.add_argument('--db', default='benchmark_pdf.db', help='Path of the scratch database.')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.db)
+    if os.path.exists(path):
+        os.remove(path)
+    directory = tempfile.mkdtemp(prefix='benchmark_pdf-')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}',
+        'INVOICE_EXPORT_WORKERS': args.workers
+    })
+
+    with app.app_context():
+        seed(args.invoices)
+        print(f"{'backend':<12} {'in process':>16} {f'pool of {args.workers}':>16}")
+        for backend in pdf_backends:
+            # The template links back to the app, which needs a request
+            with app.test_request_context():
+                invoices = Invoice.query.options(
+                    selectinload(Invoice.items).joinedload(InvoiceItem.product)
+                ).all()
+                try:
+                    single = in_process(backend, invoices, directory)
+                except Exception as e:
+                    print(f'{backend:<12} unavailable: {str(e).splitlines()[0]}')
+                    continue
+                pooled = through_pool(backend, len(invoices), directory)
+            print(f'{backend:<12} {single:10.1f} inv/s {pooled:10.1f} inv/s')
+        db.engine.dispose()
+
+    shutil.rmtree(directory, ignore_errors=True)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+if __name__ == '__main__':
+    main()
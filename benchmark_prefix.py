@@ -0,0 +1,58 @@
+"""
+Benchmarks resolving product codes to their item and category.
+
+Times utils.prefix_index.resolve() against the nested loop add_product
+used before (which scanned every prefix) on a mix of codes of every
+prefix and unknown codes, and checks that both give the same results.
+
+Usage: python benchmark_prefix.py [--codes 10000] [--repeat 5]
+"""
+import argparse
+import random
+import timeit
+from STORE.utils import prefix_index, prefixes
+
+def resolve_by_scan(code):
+    # The loop add_product used before the index
+    item = None
+    category = None
+    for item_key, prefix_data in prefixes.items():
+        if isinstance(prefix_data, dict):
+            for subcategory_key, prefix in prefix_data.items():
+                if code.startswith(prefix):
+                    item = item_key
+                    category = subcategory_key
+                    break
+        else:
+            if code.startswith(prefix_data):
+                item = item_key
+                category = ''
+                break
+    return (item, category) if item else None
+
+def sample_codes(count):
+    # Codes of every prefix, with one in ten unknown
+    known = list(prefix_index.by_prefix)
+    return [
+        f'{random.choice(known)}{random.randrange(10000):04d}' if random.random() < 0.9
+        else f'XX{random.randrange(10000):04d}'
+        for _ in range(count)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--codes', type=int, default=10000, help='Codes resolved per run.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs; the best is reported.')
+    args = parser.parse_args()
+
+    codes = sample_codes(args.codes)
+    disagreements = sum(prefix_index.resolve(code) != resolve_by_scan(code) for code in codes)
+
+    for name, resolve in (('prefix index', prefix_index.resolve), ('nested loop', resolve_by_scan)):
+        best = min(timeit.repeat(lambda: [resolve(code) for code in codes], number=1, repeat=args.repeat))
+        print(f'{name:<14} {args.codes / best:12,.0f} resolves/s {best / args.codes * 1e6:8.3f} us/resolve')
+    # Both must agree on the current prefixes; the loop would go wrong once a prefix starts another one
+    print(f'{disagreements} of {args.codes} codes resolve differently')
+
+if __name__ == '__main__':
+    main()
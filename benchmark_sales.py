@@ -0,0 +1,147 @@
+"""
+Benchmarks the sales listing queries on a seeded SQLite database.
+
+Seeds products and sales (a million by default) into a scratch database,
+then times the unfiltered listing (the default /sales page) and the first
+page, a deep page and the total of a date range, with and without the sales
+indexes. Totals are timed both over the Sale rows and from the daily rollup
+the view reads them from.
+
+Usage: python benchmark_sales.py [--sales 1000000] [--db benchmark_sales.db]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, insert, text
+from sqlalchemy.orm import Session, contains_eager
+from STORE import db
+from STORE.models import Product, Sale
+from STORE.pagination import sales_page
+from STORE.reports import rebuild_daily_sales, sales_total
+
+SEED_CHUNK_SIZE = 50000
+PRODUCTS = 2000
+PAGE_SIZE = 100
+
+def seed(engine, sales):
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(Product), [
+            {
+                'code': f'BM{number:05d}', 'item': 'shirt', 'category': 'casual', 'type_material': 'cotton',
+                'size': 'M', 'color': 'blue', 'description': 'benchmark', 'buying_price': 10,
+                'selling_price': 15, 'profit': 5, 'quantity': 100
+            }
+            for number in range(PRODUCTS)
+        ])
+        start = datetime(2023, 1, 1)
+        for offset in range(0, sales, SEED_CHUNK_SIZE):
+            connection.execute(insert(Sale), [
+                {
+                    'product_code': f'BM{random.randrange(PRODUCTS):05d}',
+                    'quantity_sold': random.randint(1, 3),
+                    'sale_date': start + timedelta(seconds=random.randrange(365 * 24 * 3600))
+                }
+                for _ in range(min(SEED_CHUNK_SIZE, sales - offset))
+            ])
+
+def sales_query(session, start_date=None, end_date=None, product_code=None):
+    # The same query as the /sales view builds
+    query = session.query(Sale).join(Sale.product).options(contains_eager(Sale.product))
+    if start_date:
+        query = query.filter(Sale.sale_date >= start_date, Sale.sale_date < end_date)
+    if product_code:
+        query = query.filter(Sale.product_code == product_code)
+    return query
+
+def timed(name, function, repeat=5):
+    best = min(_run(function) for _ in range(repeat))
+    print(f'  {name:<40} {best * 1000:8.2f} ms')
+
+def _run(function):
+    started = time.perf_counter()
+    function()
+    return time.perf_counter() - started
+
+def run(engine):
+    start_date, end_date = datetime(2023, 6, 1), datetime(2023, 6, 8)
+    with Session(engine) as session:
+        def unfiltered_page():
+            sales_page(sales_query(session), None, PAGE_SIZE)
+
+        def unfiltered_sale_total():
+            sales_query(session).with_entities(
+                func.sum(Sale.quantity_sold * Product.selling_price)
+            ).order_by(None).scalar()
+
+        def unfiltered_rollup_total():
+            sales_total(session=session)
+
+        def first_page():
+            sales_page(sales_query(session, start_date, end_date), None, PAGE_SIZE)
+
+        def tenth_page():
+            cursor = None
+            for _ in range(10):
+                _, cursor = sales_page(sales_query(session, start_date, end_date), cursor, PAGE_SIZE)
+
+        def product_page():
+            sales_page(sales_query(session, start_date, end_date, 'BM00042'), None, PAGE_SIZE)
+
+        def total():
+            sales_query(session, start_date, end_date).with_entities(
+                func.sum(Sale.quantity_sold * Product.selling_price)
+            ).order_by(None).scalar()
+
+        def rollup_total():
+            sales_total(start_date.date(), (end_date - timedelta(days=1)).date(), session=session)
+
+        # The default /sales page: first page plus the total of every sale
+        timed('first page, unfiltered', unfiltered_page)
+        timed('total of all sales, from sales', unfiltered_sale_total)
+        timed('total of all sales, from the rollup', unfiltered_rollup_total)
+        timed('first page of a week', first_page)
+        timed('ten pages of a week', tenth_page)
+        timed('first page of a week, one product', product_page)
+        timed('total of a week, from sales', total)
+        timed('total of a week, from the rollup', rollup_total)
+
+        plan = session.execute(
+            text('EXPLAIN QUERY PLAN SELECT * FROM sale WHERE sale_date >= :start AND sale_date < :end '
+                 'ORDER BY sale_date, id LIMIT 101'),
+            {'start': start_date, 'end': end_date}
+        ).all()
+        print('  plan:', '; '.join(row[-1] for row in plan))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sales', type=int, default=1000000, help='Number of sales to seed.')
+    parser.add_argument('--db', default='benchmark_sales.db', help='Path of the scratch database.')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine(f'sqlite:///{args.db}')
+    started = time.perf_counter()
+    seed(engine, args.sales)
+    with Session(engine) as session:
+        rebuild_daily_sales(session=session)
+    print(f'Seeded {args.sales} sales in {time.perf_counter() - started:.1f}s')
+
+    print('With indexes:')
+    run(engine)
+    with engine.begin() as connection:
+        for index in Sale.__table__.indexes:
+            index.drop(connection)
+    # Reconnect so no connection keeps a plan that used the indexes
+    engine.dispose()
+    print('Without indexes:')
+    run(engine)
+
+    engine.dispose()
+    os.remove(args.db)
+
+if __name__ == '__main__':
+    main()
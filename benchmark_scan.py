@@ -0,0 +1,82 @@
+"""
+Benchmarks barcode scans through the Flask test client.
+
+Seeds products into a scratch SQLite database, then scans random codes on
+/handle_barcode with full responses and with If-None-Match revalidation,
+and reports the p50 and p99 latency of each.
+
+Usage: python benchmark_scan.py [--scans 2000] [--products 5000] [--db benchmark_scan.db]
+"""
+import argparse
+import os
+import random
+import time
+from sqlalchemy import insert
+from STORE import create_app, db
+from STORE.models import Product, User
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+def seed(products):
+    db.create_all()
+    user = User(username='benchmark', email='benchmark@example.com')
+    user.set_password('benchmark')
+    db.session.add(user)
+    db.session.execute(insert(Product), [
+        {
+            'code': f'BM{number:05d}', 'item': 'shirt', 'category': 'casual', 'type_material': 'cotton',
+            'size': 'M', 'color': 'blue', 'description': 'benchmark', 'buying_price': 10,
+            'selling_price': 15, 'profit': 5, 'quantity': 100
+        }
+        for number in range(products)
+    ])
+    db.session.commit()
+
+def run(client, codes, revalidate=False):
+    etags = {}
+    latencies = []
+    for code in codes:
+        headers = {'If-None-Match': etags[code]} if revalidate and code in etags else {}
+        started = time.perf_counter()
+        response = client.get(f'/handle_barcode/{code}', headers=headers)
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code in (200, 304), response.status_code
+        if response.headers.get('ETag'):
+            etags[code] = response.headers['ETag']
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scans', type=int, default=2000, help='Scans per run.')
+    parser.add_argument('--products', type=int, default=5000, help='Products to seed.')
+    parser.add_argument('--db', default='benchmark_scan.db', help='Path of the scratch database.')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.db)
+    if os.path.exists(path):
+        os.remove(path)
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'WTF_CSRF_ENABLED': False})
+    with app.app_context():
+        seed(args.products)
+
+    client = app.test_client()
+    client.post('/login', data={'username': 'benchmark', 'password': 'benchmark'})
+    # A till scans the same popular products again and again
+    popular = [f'BM{number:05d}' for number in random.sample(range(args.products), min(200, args.products))]
+    codes = [random.choice(popular) for _ in range(args.scans)]
+
+    for name, revalidate in (('full', False), ('304', True)):
+        latencies = run(client, codes, revalidate)
+        print(f'{name:<5} p50 {percentile(latencies, 0.5) * 1000:6.2f} ms  '
+              f'p99 {percentile(latencies, 0.99) * 1000:6.2f} ms  ({args.scans} scans)')
+
+    with app.app_context():
+        db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Measures the import time of the app with `python -X importtime`.
+
+Creates the app in a fresh interpreter, prints the total import time and
+the slowest top-level imports, and exits with an error if a backend that
+should only be imported on first use (PDF, mail, NumPy, the CSV importer)
+was imported, or if the total exceeds --budget.
+
+Usage: python benchmark_startup.py [--budget 2000] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Imported on first use only; importing one at startup is a regression
+lazy_modules = ('weasyprint', 'reportlab', 'fpdf', 'flask_mail', 'numpy', 'add_data')
+
+def import_times():
+    # (self, cumulative, name) in microseconds for every module imported while creating the app.
+    # Runs from the repository, whatever the current directory, on a throwaway database.
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import STORE; STORE.create_app()'],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=dict(os.environ, DATABASE_URL='sqlite://')
+    )
+    if result.returncode:
+        raise RuntimeError(f'Creating the app failed:\n{result.stderr[-2000:]}')
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times.append((int(own), int(cumulative), name.rstrip()))
+    return times
+
+def eager_imports(times):
+    """
+    Lists the lazy modules that were imported while creating the app.
+
+    Args:
+        times (list): The entries of import_times().
+
+    Returns:
+        list: The names in lazy_modules that were imported.
+    """
+    imported = {name.strip() for _, _, name in times}
+    return [module for module in lazy_modules if any(
+        name == module or name.startswith(module + '.') for name in imported
+    )]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=None, help='Largest total import time allowed, in ms.')
+    parser.add_argument('--top', type=int, default=15, help='How many top-level imports to list.')
+    args = parser.parse_args()
+
+    times = import_times()
+    total = sum(own for own, _, _ in times) / 1000
+    print(f'Total import time: {total:.1f} ms ({len(times)} modules)')
+    # Top-level imports are the ones not indented under another import
+    top_level = [entry for entry in times if not entry[2].startswith('  ')]
+    for _, cumulative, name in sorted(top_level, reverse=True, key=lambda entry: entry[1])[:args.top]:
+        print(f'  {cumulative / 1000:8.1f} ms  {name.strip()}')
+
+    eager = eager_imports(times)
+    failed = False
+    if eager:
+        print(f"Imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if args.budget is not None and total > args.budget:
+        print(f'Import time is over the budget of {args.budget:.0f} ms')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# gunicorn.conf.py
+#
+# Settings for `gunicorn wsgi:app`; every value can be overridden from the environment.
+
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', 8000)}")
+
+# Processes for CPU-bound work (templates, serialization), threads to overlap database and disk waits
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('THREADS', 4))
+worker_class = 'gthread'
+timeout = int(os.environ.get('TIMEOUT', 60))
+keepalive = 5
+
+# Restart workers now and then so slow leaks cannot grow without bound
+max_requests = int(os.environ.get('MAX_REQUESTS', 2000))
+max_requests_jitter = 200
+
+# Create the app once in the master and fork it into the workers
+preload_app = True
+
+accesslog = os.environ.get('ACCESS_LOG', '-')
+errorlog = '-'
+
+# Workers share their metrics through files in this directory (see STORE/metrics.py)
+os.environ.setdefault('METRICS_DIR', os.path.join(tempfile.gettempdir(), f'store-metrics-{os.getpid()}'))
+
+def on_starting(server):
+    from STORE.metrics import clear_directory
+
+    os.makedirs(os.environ['METRICS_DIR'], exist_ok=True)
+    clear_directory(os.environ['METRICS_DIR'])
+
+def when_ready(server):
+    # Objects created while preloading are moved out of the collector's view, so collections in
+    # the workers do not touch (and copy) the pages they share with the master
+    gc.freeze()
+
+def post_fork(server, worker):
+    # Connections must not be shared across processes: drop the master's pool without closing its sockets
+    from STORE import db
+    from STORE.mail import start_email_sender
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # Send the outbox, including the retries of the worker this one replaces, before the first request
+    start_email_sender(app)
+
+def worker_exit(server, worker):
+    # Write the last values of a worker before it is replaced
+    from STORE.metrics import registry
+
+    registry.flush()
+
+def child_exit(server, worker):
+    from STORE.metrics import mark_process_dead
+
+    mark_process_dead(os.environ['METRICS_DIR'], worker.pid)
+
+def on_exit(server):
+    shutil.rmtree(os.environ['METRICS_DIR'], ignore_errors=True)
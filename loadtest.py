@@ -0,0 +1,96 @@
+"""
+Load-tests the main routes of a running server.
+
+Logs in, then requests the main routes from concurrent clients for a fixed
+time and reports the requests per second and the latency of each route.
+Start the server first (e.g. `gunicorn wsgi:app` or `python wsgi.py`).
+
+Usage: python loadtest.py --username admin --password secret [--url http://localhost:8000]
+       [--clients 16] [--seconds 10] [--barcode CODE]
+"""
+import argparse
+import re
+import threading
+import time
+from collections import defaultdict
+import requests
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else 0
+
+def log_in(url, username, password):
+    # The login form is protected by a CSRF token, read from the page first
+    session = requests.Session()
+    page = session.get(f'{url}/login')
+    page.raise_for_status()
+    match = re.search(r'name="csrf_token"[^>]*value="([^"]+)"', page.text)
+    data = {'username': username, 'password': password}
+    if match:
+        data['csrf_token'] = match.group(1)
+    response = session.post(f'{url}/login', data=data, allow_redirects=False)
+    if response.status_code != 302:
+        raise SystemExit('Login failed: check the username and password')
+    return session
+
+def run_client(session, url, routes, deadline, results, lock):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    index = 0
+    while time.perf_counter() < deadline:
+        route = routes[index % len(routes)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            response = session.get(url + route)
+            failed = response.status_code >= 400
+        except requests.RequestException:
+            failed = True
+        latencies[route].append(time.perf_counter() - started)
+        if failed:
+            errors[route] += 1
+    with lock:
+        for route in routes:
+            results[route]['latencies'] += latencies[route]
+            results[route]['errors'] += errors[route]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000', help='Base URL of the server.')
+    parser.add_argument('--username', required=True, help='User to log in as.')
+    parser.add_argument('--password', required=True, help='Password of the user.')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent clients.')
+    parser.add_argument('--seconds', type=float, default=10, help='Duration of the test.')
+    parser.add_argument('--barcode', help='Product code to scan. Default is none (the scan route is skipped).')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    routes = ['/index', '/grouped_products', '/sales', '/sales/data', '/invoices', '/analytics']
+    if args.barcode:
+        routes.append(f'/handle_barcode/{args.barcode}')
+
+    # One logged-in session (and connection pool) per client
+    sessions = [log_in(url, args.username, args.password) for _ in range(args.clients)]
+    results = {route: {'latencies': [], 'errors': 0} for route in routes}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    clients = [
+        threading.Thread(target=run_client, args=(session, url, routes, deadline, results, lock))
+        for session in sessions
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+
+    print(f"{'route':<32} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+    for route, result in results.items():
+        latencies = result['latencies']
+        print(f'{route:<32} {len(latencies):8d} {len(latencies) / args.seconds:8.1f} '
+              f'{percentile(latencies, 0.5) * 1000:8.1f} {percentile(latencies, 0.95) * 1000:8.1f} '
+              f"{result['errors']:7d}")
+    total = sum(len(result['latencies']) for result in results.values())
+    print(f'{total} requests in {args.seconds:g}s: {total / args.seconds:.1f} req/s with {args.clients} clients')
+
+if __name__ == '__main__':
+    main()
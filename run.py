@@ -1,15 +1,13 @@
-from STORE import app, db
-from STORE.models import User, Product  # Import models from STORE package
+from STORE import create_app, db
 from flask_migrate import Migrate
 
 if __name__ == '__main__':
+    app = create_app()
+
     # Initialize Flask-Migrate
     migrate = Migrate(app, db)
-    
-    # Create all database tables if they don't exist
-    with app.app_context():
-        db.create_all()
 
-    # Start the Flask development server
+    # Start the Flask development server (create the tables first with `flask --app STORE init-db`;
+    # serve production traffic through wsgi.py)
     app.run(debug=True)
 
@@ -0,0 +1,61 @@
+import pytest
+from STORE import create_app, db
+from STORE.models import Product, User
+from STORE.inventory import rebuild_inventory_summary
+
+@pytest.fixture
+def app(tmp_path):
+    # A file database (not :memory:) so threads and processes see the same data
+    app = create_app({
+        'TESTING': True,
+        'WTF_CSRF_ENABLED': False,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'store.db'}",
+        'INVOICE_PDF_DIR': str(tmp_path / 'invoices'),
+        'INVOICE_EMAIL_SENDER': False  # Tests send the outbox themselves
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+
+    # The caches are module globals and outlive the database of a test
+    from STORE.analytics import analytics_cache
+    from STORE.blueprints.auth import user_cache
+
+    for cache in (analytics_cache, user_cache):
+        cache.clear()
+    with app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    # A test client logged in as a user
+    with app.app_context():
+        user = User(username='till', email='till@example.com')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'username': 'till', 'password': 'secret'})
+    return client
+
+def add_products(count=1, quantity=10, prefix='TS'):
+    """
+    Adds products (and their inventory summary) to the database of the current app.
+
+    Args:
+        count (int, optional): The number of products.
+        quantity (int, optional): The stock of each product.
+        prefix (str, optional): The code prefix; codes are numbered from 1.
+
+    Returns:
+        list: The codes of the products.
+    """
+    codes = [f'{prefix}{number:04d}' for number in range(1, count + 1)]
+    for code in codes:
+        db.session.add(Product(
+            code=code, item='shirt', category='casual', type_material='cotton', size='M', color='blue',
+            description='test shirt', buying_price=10, selling_price=15, quantity=quantity
+        ))
+    db.session.commit()
+    rebuild_inventory_summary()
+    return codes
@@ -0,0 +1,23 @@
+from STORE import db
+from STORE.blueprints.auth import load_user, user_cache
+from STORE.models import User
+
+def test_changed_user_is_evicted_on_commit(app, client):
+    with app.app_context():
+        user = User.query.filter_by(username='till').one()
+        user_id = str(user.id)
+        load_user(user_id)
+        assert user_cache.get(user_id) is not None
+
+        user.email = 'rolled-back@example.com'
+        db.session.flush()
+        # A flushed change is not committed yet: the cached row is still the current one
+        assert user_cache.get(user_id) is not None
+        db.session.rollback()
+        assert user_cache.get(user_id)['email'] == 'till@example.com'
+
+        user = db.session.get(User, int(user_id))
+        user.email = 'new@example.com'
+        db.session.commit()
+        assert user_cache.get(user_id) is None
+        assert load_user(user_id).email == 'new@example.com'
@@ -0,0 +1,84 @@
+import threading
+import pytest
+from sqlalchemy import event, update
+from STORE import db
+from STORE.checkout import CheckoutError, checkout
+from STORE.inventory import verify_inventory_summary
+from STORE.models import Invoice, Product, Sale
+from STORE.reports import verify_daily_sales
+from conftest import add_products
+
+THREADS = 8
+CHECKOUTS_PER_THREAD = 10
+STOCK = 25
+
+def test_concurrent_checkouts_never_oversell(app):
+    with app.app_context():
+        code, = add_products(quantity=STOCK)
+
+    outcomes = []
+    errors = []
+    start = threading.Barrier(THREADS)
+
+    def till():
+        with app.app_context():
+            start.wait()
+            for _ in range(CHECKOUTS_PER_THREAD):
+                try:
+                    _, sold_out = checkout('Customer', '', [code])
+                    outcomes.append('sold out' if sold_out == [code] else 'sold')
+                except CheckoutError:
+                    outcomes.append('rejected')
+                except Exception as e:
+                    errors.append(e)
+
+    tills = [threading.Thread(target=till) for _ in range(THREADS)]
+    for thread in tills:
+        thread.start()
+    for thread in tills:
+        thread.join()
+
+    assert errors == []
+    # Exactly one checkout took the last unit, and it says so
+    assert outcomes.count('sold out') == 1
+    assert outcomes.count('sold') == STOCK - 1
+    assert outcomes.count('rejected') == THREADS * CHECKOUTS_PER_THREAD - STOCK
+    with app.app_context():
+        assert db.session.get(Product, code).quantity == 0
+        assert db.session.query(db.func.sum(Sale.quantity_sold)).scalar() == STOCK
+        assert Invoice.query.count() == STOCK
+        assert verify_inventory_summary() == []
+        assert verify_daily_sales() == []
+
+def test_checkout_rejects_a_basket_larger_than_the_stock(app):
+    with app.app_context():
+        code, = add_products(quantity=2)
+        with pytest.raises(CheckoutError) as error:
+            checkout('Customer', '', [code, code, code])
+        assert error.value.out_of_stock == [code]
+        assert db.session.get(Product, code).quantity == 2
+        assert Sale.query.count() == 0
+
+@pytest.mark.parametrize('returning', [True, False])
+def test_sold_out_uses_the_stock_left_by_the_sale(app, monkeypatch, returning):
+    with app.app_context():
+        code, = add_products(quantity=3)
+        monkeypatch.setattr(db.engine.dialect, 'update_returning', returning)
+
+        interleaved = []
+
+        def sell_two_first(conn, cursor, statement, parameters, context, executemany):
+            # Another till sells 2 of the 3 after this checkout loaded the product
+            if statement.startswith('UPDATE product') and not interleaved:
+                interleaved.append(statement)
+                with db.engine.begin() as other:
+                    other.execute(update(Product).where(Product.code == code).values(quantity=1))
+
+        event.listen(db.engine, 'before_cursor_execute', sell_two_first)
+        try:
+            _, sold_out = checkout('Customer', '', [code])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', sell_two_first)
+        assert interleaved
+        assert sold_out == [code]
+        assert db.session.get(Product, code).quantity == 0
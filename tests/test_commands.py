@@ -0,0 +1,58 @@
+from STORE import db, search
+from STORE.checkout import checkout
+from STORE.inventory import inventory_summary, verify_inventory_summary
+from STORE.models import DailySales, InventorySummary
+from STORE.reports import sales_total, verify_daily_sales
+from conftest import add_products
+
+def init_db(app):
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert result.exit_code == 0, result.output
+    return result.output
+
+def test_init_db_builds_a_new_inventory_summary(app):
+    # A database from before the summary table existed
+    with app.app_context():
+        add_products(3, prefix='ID')
+        InventorySummary.__table__.drop(db.engine)
+
+    assert 'Inventory summary built with 1 groups' in init_db(app)
+    with app.app_context():
+        assert verify_inventory_summary() == []
+        assert [summary.total_quantity for summary in inventory_summary()] == [30]
+    # Only once: later runs leave the summary to the app
+    assert 'Inventory summary' not in init_db(app)
+
+def test_init_db_builds_a_missing_search_index(app, client, caplog, monkeypatch):
+    # A database whose product table predates the search index
+    with app.app_context():
+        add_products(2, prefix='FT')
+        with db.engine.begin() as connection:
+            for trigger in ('insert', 'delete', 'update'):
+                connection.exec_driver_sql(f'DROP TRIGGER product_fts_{trigger}')
+            connection.exec_driver_sql('DROP TABLE product_fts')
+    monkeypatch.setattr(search, '_search_index_ready', False)
+    monkeypatch.setattr(search, '_fallback_logged', False)
+
+    assert client.post('/filter_products', json={'search_term': 'shirt'}).status_code == 200
+    assert 'full scan' in caplog.text
+
+    assert 'Search index built with 2 products' in init_db(app)
+    with app.app_context():
+        assert search.search_index_available()
+        # The triggers keep the new index up to date
+        add_products(1, prefix='FU')
+        assert [product.code for product in search.search_products('shirt')[0]] == ['FT0001', 'FT0002', 'FU0001']
+
+def test_init_db_backfills_a_new_daily_sales_rollup(app):
+    # A database with sales from before the rollup existed
+    with app.app_context():
+        codes = add_products(2, prefix='DS')
+        checkout('Customer', '', [codes[0], codes[0], codes[1]])
+        DailySales.__table__.drop(db.engine)
+
+    assert 'Daily sales rollup built with 2 rows' in init_db(app)
+    with app.app_context():
+        assert verify_daily_sales() == []
+        assert sales_total() == 45
+    assert 'Daily sales' not in init_db(app)
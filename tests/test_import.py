@@ -0,0 +1,46 @@
+import add_data
+from STORE.models import Product
+
+HEADER = 'code,item,category,type_material,size,color,description,buying_price,selling_price,quantity\n'
+
+def write_csv(path, lines):
+    path.write_text(HEADER + ''.join(f'{line}\n' for line in lines), encoding='utf-8')
+    return str(path)
+
+def test_repeated_codes_add_up(app, tmp_path):
+    csv_file = write_csv(tmp_path / 'products.csv', [
+        'IM0001,shirt,casual,cotton,M,blue,first,10,15,1',
+        'IM0002,shirt,casual,cotton,M,blue,other,10,15,1',
+        'IM0001,shirt,casual,cotton,M,blue,second,10,15,2',
+        'IM0003,shirt,casual,cotton,M,blue,bad,10,15,many',
+        'IM0001,shirt,casual,cotton,M,blue,third,10,15,3',
+        'IM0002,shirt,casual,cotton,M,blue,again,10,15,4'
+    ])
+    with app.app_context():
+        report = add_data.add_products_from_csv(csv_file, chunk_size=4)
+        products = {product.code: (product.description, product.quantity) for product in Product.query}
+
+    assert (report['rows'], report['inserted'], report['updated'], report['failed']) == (6, 2, 3, 1)
+    assert report['inserted'] + report['updated'] + report['failed'] == report['rows']
+    assert [error['line'] for error in report['errors']] == [5]
+    # The last row of a code wins
+    assert products == {'IM0001': ('third', 3), 'IM0002': ('again', 4)}
+
+def test_failed_chunk_reports_every_row_once(app, tmp_path, monkeypatch):
+    csv_file = write_csv(tmp_path / 'products.csv', [
+        ',hat,casual,cotton,M,blue,no prefix,10,15,1',
+        ',shirt,casual,cotton,M,blue,new code,10,15,1',
+        'IM0009,shirt,casual,cotton,M,blue,own code,10,15,1'
+    ])
+
+    def locked(prefix, count=1):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(add_data, 'reserve_codes', locked)
+    with app.app_context():
+        report = add_data.add_products_from_csv(csv_file)
+        assert Product.query.count() == 0
+
+    assert (report['rows'], report['inserted'], report['updated'], report['failed']) == (3, 0, 0, 3)
+    assert [(error['line'], error['code']) for error in report['errors']] == [(2, None), (3, None), (4, 'IM0009')]
+    assert report['errors'][1]['error'] == 'database is locked'
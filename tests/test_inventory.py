@@ -0,0 +1,29 @@
+from sqlalchemy import insert
+from STORE import db
+from STORE.inventory import apply_summary_delta
+from STORE.models import InventorySummary
+
+def test_summary_row_created_concurrently_is_incremented(app, monkeypatch):
+    with app.app_context():
+        get = db.session.get
+        lookups = []
+
+        def get_after_another_request(*args, **kwargs):
+            # Another request creates the group between this request's lookup and insert
+            lookups.append(args)
+            if len(lookups) == 1:
+                with db.engine.begin() as connection:
+                    connection.execute(insert(InventorySummary).values(
+                        item='shirt', category='casual', total_quantity=2, total_buying_price=20,
+                        total_selling_price=30, total_profit=10
+                    ))
+                return None
+            return get(*args, **kwargs)
+
+        monkeypatch.setattr(db.session, 'get', get_after_another_request)
+        apply_summary_delta('shirt', 'casual', 3, 30, 45, 15)
+        db.session.commit()
+        monkeypatch.undo()
+
+        summary = db.session.get(InventorySummary, ('shirt', 'casual'))
+        assert (summary.total_quantity, summary.total_selling_price, summary.total_profit) == (5, 75, 25)
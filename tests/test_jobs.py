@@ -0,0 +1,59 @@
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import inspect
+from STORE import db
+from STORE.models import ImportJob
+
+def add_job(app, heartbeat_age):
+    with app.app_context():
+        started = datetime.utcnow() - timedelta(seconds=heartbeat_age)
+        job = ImportJob(filename='products.csv', status='running', started_at=started, heartbeat_at=started)
+        db.session.add(job)
+        db.session.commit()
+        return job.id
+
+def test_running_job_without_heartbeat_fails(app, client):
+    app.config['IMPORT_JOB_TIMEOUT'] = 60
+    alive = add_job(app, 10)
+    dead = add_job(app, 120)
+
+    assert client.get(f'/import_jobs/{alive}').get_json()['status'] == 'running'
+    job = client.get(f'/import_jobs/{dead}').get_json()
+    assert job['status'] == 'failed'
+    assert job['finished_at'] and 'no progress' in job['error']
+
+def test_init_db_adds_new_columns(app):
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('ALTER TABLE import_job DROP COLUMN heartbeat_at')
+
+    result = app.test_cli_runner().invoke(args=['init-db'])
+    assert 'Added heartbeat_at to import_job' in result.output
+    with app.app_context():
+        assert 'heartbeat_at' in {column['name'] for column in inspect(db.engine).get_columns('import_job')}
+
+def test_import_runs_in_the_background(app, client, tmp_path, monkeypatch):
+    # /add_data_to_db imports products.csv from the working directory
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'products.csv').write_text(
+        'code,item,category,type_material,size,color,description,buying_price,selling_price,quantity\n'
+        'BG0001,shirt,casual,cotton,M,blue,first,10,15,1\n'
+        'BG0002,shirt,casual,cotton,L,blue,bad,10,15,many\n',
+        encoding='utf-8'
+    )
+
+    response = client.get('/add_data_to_db')
+    assert response.status_code == 202
+    started = response.get_json()
+    assert started['status_url'] == f"/import_jobs/{started['job_id']}"
+
+    deadline = time.monotonic() + 10
+    while True:
+        job = client.get(started['status_url']).get_json()
+        if job['status'] not in ('queued', 'running') or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    assert job['status'] == 'finished'
+    assert (job['total_rows'], job['rows_processed'], job['rows_failed']) == (2, 2, 1)
+    assert (job['report']['inserted'], job['report']['errors'][0]['line']) == (1, 3)
+    assert client.get('/import_jobs/999').status_code == 404
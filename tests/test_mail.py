@@ -0,0 +1,105 @@
+import socket
+from datetime import datetime, timedelta
+import pytest
+from aiosmtpd.controller import Controller
+from STORE import db
+from STORE.checkout import checkout
+from STORE.mail import _claim_batch, send_pending_emails
+from STORE.models import InvoiceEmail
+from conftest import add_products
+
+class Recorder:
+    # An SMTP handler that keeps every message and the connection it came on
+    def __init__(self):
+        self.messages = []
+        self.sessions = []
+        self.port = None
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        if session not in self.sessions:
+            self.sessions.append(session)
+        return '250 OK'
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp(app):
+    recorder = Recorder()
+    controller = Controller(recorder, hostname='127.0.0.1', port=free_port())
+    controller.start()
+    recorder.port = controller.port
+    # Flask-Mail only records messages under TESTING unless told to send them
+    app.config.update(
+        MAIL_SERVER='127.0.0.1', MAIL_PORT=controller.port, MAIL_SUPPRESS_SEND=False, INVOICE_PDF_BACKEND='fpdf'
+    )
+    yield recorder
+    controller.stop()
+
+def queue_emails(app, count):
+    with app.app_context():
+        codes = add_products(count, prefix='ML')
+        for number, code in enumerate(codes):
+            checkout('Customer', f'customer{number}@example.com', [code])
+
+def send(app):
+    with app.test_request_context():
+        return send_pending_emails()
+
+def outbox(app):
+    with app.app_context():
+        return InvoiceEmail.query.order_by(InvoiceEmail.id).all()
+
+def test_one_connection_per_batch(app, smtp):
+    app.config['INVOICE_EMAIL_BATCH_SIZE'] = 2
+    queue_emails(app, 5)
+
+    assert send(app) == {'sent': 5, 'failed': 0}
+    assert len(smtp.messages) == 5
+    assert len(smtp.sessions) == 3
+    assert all(b'application/pdf' in envelope.content for envelope in smtp.messages)
+    assert {email.status for email in outbox(app)} == {'sent'}
+
+def test_refused_connection_is_retried_with_backoff(app, smtp):
+    app.config.update(MAIL_PORT=free_port(), INVOICE_EMAIL_BACKOFF=60)
+    queue_emails(app, 2)
+
+    started = datetime.utcnow()
+    assert send(app) == {'sent': 0, 'failed': 2}
+    for email in outbox(app):
+        assert (email.status, email.attempts) == ('pending', 1)
+        assert email.error
+        # The first retry waits INVOICE_EMAIL_BACKOFF, with up to 50% jitter
+        assert started + timedelta(seconds=29) < email.next_attempt_at < started + timedelta(seconds=91)
+
+    # Nothing is due before the backoff ends
+    assert send(app) == {'sent': 0, 'failed': 0}
+
+    # The server comes back; Flask-Mail reads its settings when set up, so it is set up again
+    app.config['MAIL_PORT'] = smtp.port
+    app.extensions.pop('mail')
+    with app.app_context():
+        InvoiceEmail.query.update({'next_attempt_at': datetime.utcnow()})
+        db.session.commit()
+    assert send(app) == {'sent': 2, 'failed': 0}
+    assert [(email.status, email.error) for email in outbox(app)] == [('sent', None)] * 2
+
+def test_expired_lease_is_reclaimed(app, smtp):
+    queue_emails(app, 1)
+
+    # A sender claims the email and dies before sending it
+    with app.test_request_context():
+        assert len(_claim_batch(datetime.utcnow())) == 1
+    assert send(app) == {'sent': 0, 'failed': 0}
+    assert smtp.messages == []
+
+    with app.app_context():
+        InvoiceEmail.query.update({'next_attempt_at': datetime.utcnow() - timedelta(seconds=1)})
+        db.session.commit()
+    assert send(app) == {'sent': 1, 'failed': 0}
+    assert len(smtp.messages) == 1
+    [email] = outbox(app)
+    assert (email.status, email.claimed_by) == ('sent', None)
@@ -0,0 +1,56 @@
+import json
+import os
+from STORE.checkout import checkout
+from STORE.metrics import DEAD_WORKERS_FILE, import_rows, mark_process_dead, registry, sale_items
+from conftest import add_products
+
+def test_metrics_need_a_token_or_a_local_scrape(app):
+    client = app.test_client()
+    remote = {'REMOTE_ADDR': '10.0.0.5'}
+
+    assert client.get('/metrics').status_code == 200
+    assert client.get('/metrics', environ_base=remote).status_code == 403
+
+    app.config['METRICS_PUBLIC'] = True
+    assert client.get('/metrics', environ_base=remote).status_code == 200
+
+    app.config['METRICS_TOKEN'] = 'secret'
+    assert client.get('/metrics').status_code == 401
+    headers = {'Authorization': 'Bearer secret'}
+    assert client.get('/metrics', environ_base=remote, headers=headers).status_code == 200
+
+def test_sale_items_counts_units(app):
+    with app.app_context():
+        first, second = add_products(2, prefix='MT')
+        before = sale_items._default().value()
+        checkout('Customer', '', [first, first, ' ', second])
+    after = sale_items._default().value()
+
+    # One sale (the bucket counts, then the sum) of three units
+    assert sum(after[:-1]) - sum(before[:-1]) == 1
+    assert after[-1] - before[-1] == 3
+
+def write_worker(directory, pid, rows):
+    with open(os.path.join(directory, f'{pid}-0000abcd.json'), 'w') as file:
+        json.dump({'pid': pid, 'metrics': {
+            'store_import_rows_total': {json.dumps(['inserted']): rows},
+            'store_db_pool_connections': {json.dumps(['idle']): 2}
+        }}, file)
+
+def test_dead_workers_are_merged_into_one_file(tmp_path):
+    for pid, rows in ((101, 5), (102, 7), (103, 11)):
+        write_worker(tmp_path, pid, rows)
+    mark_process_dead(tmp_path, 101)
+    mark_process_dead(tmp_path, 102)
+
+    assert sorted(os.listdir(tmp_path)) == ['103-0000abcd.json', DEAD_WORKERS_FILE]
+    with open(tmp_path / DEAD_WORKERS_FILE) as file:
+        # Counters are added up, gauges are dropped
+        assert json.load(file)['metrics'] == {'store_import_rows_total': {json.dumps(['inserted']): 12}}
+
+    registry.configure(str(tmp_path))
+    try:
+        totals = registry.aggregate()
+    finally:
+        registry.configure(None)
+    assert totals[import_rows.name][('inserted',)] - import_rows.labels('inserted').value() == 23
@@ -0,0 +1,9 @@
+import re
+
+def test_index_scripts_are_served(client):
+    page = client.get('/index').get_data(as_text=True)
+    scripts = re.findall(r'<script src="(/static/[^"]+)"', page)
+
+    assert '/static/js/search.js' in scripts
+    for script in scripts:
+        assert client.get(script).status_code == 200
@@ -0,0 +1,57 @@
+import os
+import zipfile
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from STORE import pdf
+from STORE.blueprints import invoices
+from STORE.checkout import checkout
+from conftest import add_products
+
+def test_export_command_renders_in_the_export_pool(app, tmp_path):
+    app.config.update(INVOICE_PDF_BACKEND='fpdf', INVOICE_EXPORT_WORKERS=3)
+    with app.app_context():
+        codes = add_products(3, prefix='EX')
+        for code in codes:
+            checkout('Customer', '', [code])
+
+    output = tmp_path / 'invoices.zip'
+    result = app.test_cli_runner().invoke(args=['export-invoices', '--output', str(output)])
+    assert result.exit_code == 0, result.output
+
+    with zipfile.ZipFile(output) as archive:
+        assert sorted(archive.namelist()) == ['invoice-1.pdf', 'invoice-2.pdf', 'invoice-3.pdf']
+    executor = pdf._executors.pop('export')
+    try:
+        assert executor._max_workers == 3
+    finally:
+        executor.shutdown()
+
+def sell_one(app):
+    app.config['INVOICE_PDF_BACKEND'] = 'fpdf'
+    with app.app_context():
+        [code] = add_products(1, prefix='PD')
+        invoice, _ = checkout('Customer', '', [code])
+        return invoice.id
+
+@pytest.mark.parametrize('error, status', [(TimeoutError(), 504), (BrokenProcessPool(), 503)])
+def test_pdf_render_failures_are_reported(app, client, monkeypatch, error, status):
+    invoice_id = sell_one(app)
+
+    def fail(invoice, backend=None):
+        raise error
+
+    monkeypatch.setattr(invoices, 'get_invoice_pdf', fail)
+    response = client.get(f'/print_invoice/{invoice_id}/pdf')
+    assert response.status_code == status
+    assert response.get_json()['error']
+
+def test_a_dead_worker_does_not_break_later_renders(app, client):
+    invoice_id = sell_one(app)
+
+    # A worker dies (e.g. killed for memory) and takes the pool down with it
+    with app.app_context():
+        assert isinstance(pdf._submit('requests', os._exit, 1).exception(timeout=30), BrokenProcessPool)
+
+    response = client.get(f'/print_invoice/{invoice_id}/pdf')
+    assert response.status_code == 200
+    assert response.data.startswith(b'%PDF')
@@ -0,0 +1,45 @@
+import pytest
+from STORE import db
+from STORE.checkout import checkout
+from STORE.queries import assert_max_queries, count_queries
+from conftest import add_products
+
+# Statements a listing page may run: the page, its eager loads and the total
+MAX_LISTING_QUERIES = 4
+
+def sell(count, prefix):
+    # One invoice per sale, each with two products
+    codes = add_products(count + 1, prefix=prefix)
+    for first, second in zip(codes, codes[1:]):
+        checkout('Customer', '', [first, second, second])
+
+@pytest.mark.parametrize('path', ['/sales', '/invoices'])
+def test_listing_queries_do_not_grow_with_rows(app, client, path):
+    with app.app_context():
+        engine = db.engine
+
+    counts = []
+    for count, prefix in ((1, 'QA'), (49, 'QB')):
+        with app.app_context():
+            sell(count, prefix)
+        # Warm up, so the logged-in user is cached like on every later request
+        client.get(path)
+        with assert_max_queries(MAX_LISTING_QUERIES, engine):
+            with count_queries(engine) as queries:
+                response = client.get(path)
+        assert response.status_code == 200
+        counts.append(queries.count)
+
+    # 1 sale and 50 sales (2 and 100 rows for /sales) take the same queries
+    assert counts[0] == counts[1]
+
+def test_invoices_are_paginated(app, client):
+    with app.app_context():
+        sell(5, 'PG')
+
+    first = client.get('/invoices?limit=3').get_data(as_text=True)
+    assert 'Next page' in first
+    assert first.count('Preview') == 3
+    last = client.get('/invoices?limit=3&cursor=3').get_data(as_text=True)
+    assert last.count('Preview') == 2
+    assert 'Next page' not in last
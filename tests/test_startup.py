@@ -0,0 +1,10 @@
+from benchmark_startup import eager_imports, import_times, lazy_modules
+
+def test_create_app_does_not_import_lazy_backends():
+    times = import_times()
+    assert eager_imports(times) == []
+    # The check itself must see the app's imports
+    assert any(name.strip() == 'STORE' for _, _, name in times)
+
+def test_lazy_backends_are_checked():
+    assert {'numpy', 'flask_mail', 'weasyprint'} <= set(lazy_modules)
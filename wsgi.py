@@ -0,0 +1,28 @@
+"""
+Production entry point.
+
+gunicorn (Linux/macOS) loads `wsgi:app` with the settings of gunicorn.conf.py:
+
+    gunicorn wsgi:app
+
+waitress (any platform, including Windows) is started by running this file:
+
+    python wsgi.py
+
+Create the schema once beforehand with `flask --app STORE init-db`.
+"""
+import os
+from STORE import create_app
+
+app = create_app()
+
+if __name__ == '__main__':
+    from waitress import serve
+
+    # One process; waitress serves requests from a thread pool
+    serve(
+        app,
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 8000)),
+        threads=int(os.environ.get('THREADS', (os.cpu_count() or 1) * 4))
+    )